@@ -0,0 +1,267 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+from core.llm_service import is_error_response
+
+
+class ChatSessionStore:
+    """SQLite store of chat sessions, their turns and a running summary of older turns"""
+
+    def __init__(self, db_path: str = "../storage/chat/sessions.sqlite3"):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, title TEXT NOT NULL, summary TEXT NOT NULL DEFAULT '', "
+            "summarized_through INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "turn_id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, role TEXT NOT NULL, "
+            "content TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id, turn_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        self._conn.commit()
+
+    def create(self, title: str = '') -> Dict[str, Any]:
+        """Start a new session"""
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, title, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, title, now, now)
+            )
+            self._conn.commit()
+        return self.get(session_id)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recently active sessions first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.session_id, s.title, s.created_at, s.updated_at, "
+                "(SELECT COUNT(*) FROM turns t WHERE t.session_id = s.session_id) AS turn_count "
+                "FROM sessions s ORDER BY s.updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        return bool(deleted)
+
+    def add_turns(self, session_id: str, turns: List[Dict[str, str]]) -> None:
+        """Append {"role", "content"} turns to a session"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO turns (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, turn["role"], turn["content"], now) for turn in turns]
+            )
+            self._conn.execute("UPDATE sessions SET updated_at = ? WHERE session_id = ?", (now, session_id))
+            self._conn.commit()
+
+    def turns(self, session_id: str, after: int = 0, limit: Optional[int] = None,
+              newest_first: bool = False) -> List[Dict[str, Any]]:
+        """Turns with turn_id greater than after, oldest first unless newest_first"""
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT turn_id, role, content, created_at FROM turns WHERE session_id = ? AND turn_id > ? "
+                f"ORDER BY turn_id {order} LIMIT ?", (session_id, after, limit if limit is not None else -1)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_summary(self, session_id: str, summary: str, summarized_through: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET summary = ?, summarized_through = ? WHERE session_id = ?",
+                (summary, summarized_through, session_id)
+            )
+            self._conn.commit()
+
+
+class ConversationMemory:
+    """Builds a bounded-size prompt from a session: running summary + rolling window of recent turns
+
+    The history portion of the prompt never exceeds history_tokens: up to a
+    third goes to the summary and the rest to the newest turns that fit (at
+    most window_turns). Turns that slide out of the window are folded into
+    the summary in the background after each exchange.
+    """
+
+    SUMMARY_PROMPT = (
+        "Update the running summary of a conversation. Keep facts, decisions, names, numbers and open "
+        "questions; drop pleasantries. Reply with the updated summary only, in at most {words} words.\n\n"
+        "Current summary:\n{summary}\n\nNew turns:\n{turns}"
+    )
+
+    FRAMING_TOKENS = 24
+
+    def __init__(self, store: ChatSessionStore, llm_service, context_packer, history_tokens: int = 1200,
+                 window_turns: int = 8):
+        self.store = store
+        self.llm_service = llm_service
+        self.context_packer = context_packer
+        self.history_tokens = history_tokens
+        self.window_turns = window_turns
+        self.summaries_written = 0
+        self.summary_failures = 0
+        self.last_error = None
+        self._summarizing = set()
+        self._resummarize = set()
+        self._tasks = set()
+
+    @property
+    def summary_tokens(self) -> int:
+        return self.history_tokens // 3
+
+    @staticmethod
+    def _format_turn(turn: Dict[str, Any]) -> str:
+        return f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}"
+
+    @property
+    def window_tokens(self) -> int:
+        """Budget for verbatim turns: whatever the summary and framing cannot use"""
+        return self.history_tokens - self.summary_tokens - self.FRAMING_TOKENS
+
+    def _window(self, session: Dict[str, Any], provider: str) -> List[Dict[str, Any]]:
+        """Newest turns that fit window_tokens, oldest first; the oldest may be truncated to fit
+
+        build_prompt and summarize both use this, so every turn is either in the
+        window or due to be folded into the summary, never both or neither.
+        """
+        budget = self.window_tokens
+        window, used = [], 0
+        for turn in self.store.turns(session["session_id"], limit=self.window_turns, newest_first=True):
+            line = self._format_turn(turn)
+            cost = self.context_packer.count_tokens(line, provider)
+            if used + cost > budget:
+                if budget - used > 20:
+                    window.append({**turn, "line": self.context_packer.truncate(line, budget - used, provider)})
+                break
+            window.append({**turn, "line": line})
+            used += cost
+        window.reverse()
+        return window
+
+    def build_prompt(self, session_id: str, message: str, provider: str = 'openai') -> Dict[str, Any]:
+        """Prompt for the next message plus token accounting"""
+        session = self.store.get(session_id)
+        summary = self.context_packer.truncate(session["summary"], self.summary_tokens, provider)
+        # Headers and line breaks are budgeted up front so the history stays within history_tokens
+        window = self._window(session, provider)
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of earlier conversation:\n{summary}")
+        if window:
+            sections.append("Recent conversation:\n" + "\n".join(turn["line"] for turn in window))
+        history = "\n\n".join(sections)
+        prompt = f"{history}\n\nUser: {message}" if history else message
+        return {
+            "prompt": prompt,
+            "history_tokens": self.context_packer.count_tokens(history, provider),
+            "history_budget": self.history_tokens,
+            "turns_in_window": len(window),
+            "summary_used": bool(summary)
+        }
+
+    def record_exchange(self, session_id: str, message: str, response: str, provider: str = 'openai') -> None:
+        """Store a user/assistant exchange and fold turns that left the window into the summary"""
+        self.store.add_turns(session_id, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response}
+        ])
+        task = asyncio.ensure_future(self.summarize(session_id, provider))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def summarize(self, session_id: str, provider: str = 'openai') -> None:
+        """Fold turns older than the current window into the session's running summary
+
+        A call that arrives while a summary is running marks the session for
+        another pass, so turns added meanwhile still reach the summary.
+        """
+        if session_id in self._summarizing:
+            self._resummarize.add(session_id)
+            return
+        self._summarizing.add(session_id)
+        try:
+            while True:
+                self._resummarize.discard(session_id)
+                await self._summarize_once(session_id, provider)
+                if session_id not in self._resummarize:
+                    break
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def _summarize_once(self, session_id: str, provider: str) -> None:
+        try:
+            session = self.store.get(session_id)
+            if session is None:
+                return
+            window = self._window(session, provider)
+            oldest_in_window = window[0]["turn_id"] if window else None
+            pending = [
+                turn for turn in self.store.turns(session_id, after=session["summarized_through"])
+                if oldest_in_window is None or turn["turn_id"] < oldest_in_window
+            ]
+            if not pending:
+                return
+
+            turns = "\n".join(self._format_turn(turn) for turn in pending)
+            prompt = self.SUMMARY_PROMPT.format(
+                words=int(self.summary_tokens * 0.75), summary=session["summary"] or "(none)", turns=turns
+            )
+            summary = await self.llm_service.send_request(provider, prompt=prompt)
+            if is_error_response(summary):
+                # Keep the history bounded even when the provider is unavailable: newest lines win
+                self.summary_failures += 1
+                self.last_error = summary[:200]
+                summary = self._keep_tail("\n".join(filter(None, [session["summary"], turns])), provider)
+            else:
+                summary = self.context_packer.truncate(summary.strip(), self.summary_tokens, provider)
+            self.store.set_summary(session_id, summary, pending[-1]["turn_id"])
+            self.summaries_written += 1
+        except Exception as e:
+            self.summary_failures += 1
+            self.last_error = f"{session_id}: {e}"
+
+    def _keep_tail(self, text: str, provider: str) -> str:
+        """Newest whole lines of text within summary_tokens, dropping the oldest first"""
+        kept, used = [], 0
+        for line in reversed(text.strip().split("\n")):
+            cost = self.context_packer.count_tokens(line, provider) + 1
+            if used + cost > self.summary_tokens:
+                if not kept:
+                    kept.append(self.context_packer.truncate(line, self.summary_tokens - 1, provider))
+                break
+            kept.append(line)
+            used += cost
+        return "\n".join(reversed(kept))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "history_tokens": self.history_tokens,
+            "window_turns": self.window_turns,
+            "summaries_written": self.summaries_written,
+            "summary_failures": self.summary_failures,
+            "last_error": self.last_error,
+            "summarizing": len(self._summarizing)
+        }
@@ -0,0 +1,85 @@
+import re
+import hashlib
+import unicodedata
+from typing import List, Dict, Any, Iterable
+
+# Whitespace-delimited words are a cheap, tokenizer-free proxy for model tokens.
+# MiniLM's wordpiece vocabulary averages ~1.3 pieces per English word, so the
+# defaults below keep each chunk under the 256-piece window of the default
+# ChromaDB embedding model.
+_TOKEN_PATTERN = re.compile(r'\S+')
+_SENTENCE_END = re.compile(r'[.!?;:]["\')\]]?$')
+
+
+def content_hash(text: str) -> str:
+    """Hash of whitespace- and unicode-normalized chunk text; chunk ids are built from it"""
+    normalized = " ".join(unicodedata.normalize('NFC', text).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+
+
+class TextChunker:
+    """Token-aware text splitter producing overlapping chunks with offsets"""
+
+    def __init__(self, chunk_size: int = 180, chunk_overlap: int = 30):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if chunk_overlap < 0 or chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be between 0 and chunk_size - 1")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate the number of tokens in text"""
+        return sum(1 for _ in _TOKEN_PATTERN.finditer(text))
+
+    def split_text(self, text: str) -> List[Dict[str, Any]]:
+        """Split text into overlapping chunks with character offsets"""
+        spans = [(m.start(), m.end()) for m in _TOKEN_PATTERN.finditer(text)]
+        if not spans:
+            return []
+
+        chunks = []
+        start = 0
+        total = len(spans)
+        while start < total:
+            end = min(start + self.chunk_size, total)
+
+            # Prefer to close a chunk on a sentence boundary in its last quarter
+            if end < total:
+                floor = start + (self.chunk_size * 3) // 4
+                for i in range(end - 1, floor - 1, -1):
+                    if _SENTENCE_END.search(text[spans[i][0]:spans[i][1]]):
+                        end = i + 1
+                        break
+
+            char_start = spans[start][0]
+            char_end = spans[end - 1][1]
+            chunks.append({
+                "text": text[char_start:char_end],
+                "offset": char_start,
+                "token_count": end - start
+            })
+
+            if end >= total:
+                break
+            start = max(end - self.chunk_overlap, start + 1)
+
+        return chunks
+
+    def split_segments(self, segments: Iterable[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        """Split extracted segments (pages, sheets) into chunks, carrying their metadata
+
+        Segments flagged atomic (e.g. spreadsheet row windows) are already
+        chunk-sized and are passed through whole. They carry no character
+        offset; their location is the segment's own metadata (rows, sheet).
+        """
+        for segment in segments:
+            text = segment.get("text") or ""
+            location = {k: v for k, v in segment.items() if k not in ("text", "atomic")}
+            if segment.get("atomic"):
+                if text.strip():
+                    yield dict(location, text=text, token_count=self.count_tokens(text))
+                continue
+            for chunk in self.split_text(text):
+                chunk.update(location)
+                yield chunk
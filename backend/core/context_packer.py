@@ -0,0 +1,122 @@
+import math
+import re
+from typing import List, Dict, Any, Optional
+
+# Characters per token by provider family. Measured on mixed English prose
+# and tabular exports; close enough to budget prompts without shipping each
+# provider's tokenizer.
+CHARS_PER_TOKEN = {
+    'openai': 4.0,
+    'groq': 3.8,
+    'deepseek': 3.8,
+    'claude': 3.5,
+    'gemini': 4.0,
+    'qwen': 3.3
+}
+
+# Context windows (tokens) of the default model for each provider
+CONTEXT_WINDOWS = {
+    'openai': 128000,
+    'claude': 200000,
+    'gemini': 30720,
+    'groq': 32768,
+    'deepseek': 32768,
+    'qwen': 8000
+}
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+
+class ContextPacker:
+    """Packs retrieved passages into a per-provider token budget"""
+
+    def __init__(self, default_budget: int = 1500, reserved_output_tokens: int = 1000,
+                 duplicate_threshold: float = 0.8, separator: str = "\n\n"):
+        self.default_budget = default_budget
+        self.reserved_output_tokens = reserved_output_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.separator = separator
+
+    def count_tokens(self, text: str, provider: str = 'openai') -> int:
+        """Estimate the number of tokens text uses for the provider's tokenizer"""
+        if not text:
+            return 0
+        return math.ceil(len(text) / CHARS_PER_TOKEN.get(provider, 4.0))
+
+    def budget_for(self, provider: str, question: str, budget: Optional[int] = None) -> int:
+        """Requested budget, capped so question, context and output fit the model's window"""
+        window = CONTEXT_WINDOWS.get(provider, 8000)
+        available = window - self.reserved_output_tokens - self.count_tokens(question, provider)
+        return max(0, min(budget or self.default_budget, available))
+
+    def pack(self, passages: List[Dict[str, Any]], provider: str = 'openai', budget: Optional[int] = None,
+             question: str = '') -> Dict[str, Any]:
+        """Deduplicate passages, order them by relevance and fill the token budget
+
+        passages are dicts with "text" and an optional relevance "score". The
+        last passage that does not fit whole is truncated to use the remaining
+        budget exactly.
+        """
+        budget = self.budget_for(provider, question, budget)
+        ranked = sorted(passages, key=lambda passage: passage.get("score") or 0.0, reverse=True)
+
+        kept, shingles, duplicates = [], [], 0
+        for passage in ranked:
+            text = (passage.get("text") or "").strip()
+            if not text:
+                continue
+            signature = self._shingles(text)
+            if any(self._jaccard(signature, other) >= self.duplicate_threshold for other in shingles):
+                duplicates += 1
+                continue
+            shingles.append(signature)
+            kept.append(text)
+
+        parts, used, truncated = [], 0, False
+        separator_tokens = self.count_tokens(self.separator, provider)
+        for text in kept:
+            cost = self.count_tokens(text, provider) + (separator_tokens if parts else 0)
+            if used + cost <= budget:
+                parts.append(text)
+                used += cost
+                continue
+            remaining = budget - used - (separator_tokens if parts else 0)
+            if remaining > 0:
+                clipped = self.truncate(text, remaining, provider)
+                if clipped:
+                    parts.append(clipped)
+                    used += self.count_tokens(clipped, provider) + (separator_tokens if len(parts) > 1 else 0)
+                    truncated = True
+            break
+
+        return {
+            "context": self.separator.join(parts),
+            "tokens_used": used,
+            "budget": budget,
+            "passages_used": len(parts),
+            "passages_dropped_duplicate": duplicates,
+            "truncated": truncated
+        }
+
+    def truncate(self, text: str, max_tokens: int, provider: str = 'openai') -> str:
+        """Longest word-boundary prefix of text within max_tokens"""
+        limit = int(max_tokens * CHARS_PER_TOKEN.get(provider, 4.0))
+        clipped = text[:limit]
+        if len(clipped) < len(text) and ' ' in clipped:
+            clipped = clipped[:clipped.rindex(' ')]
+        while clipped and self.count_tokens(clipped, provider) > max_tokens:
+            clipped = clipped[:-1]
+        return clipped.rstrip()
+
+    @staticmethod
+    def _shingles(text: str, size: int = 5) -> set:
+        words = _WORD_PATTERN.findall(text.lower())
+        if len(words) <= size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _jaccard(a: set, b: set) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+
+SORT_FIELDS = ('ingested_at', 'filename', 'size_bytes', 'chunk_count')
+
+
+class DocumentCatalog:
+    """SQLite catalog of ingested documents, so listings never touch the vector store"""
+
+    def __init__(self, catalog_path: str = "../storage/rag/catalog.sqlite3"):
+        os.makedirs(os.path.dirname(catalog_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(catalog_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, filename TEXT NOT NULL, file_type TEXT NOT NULL, "
+            "size_bytes INTEGER NOT NULL, chunk_count INTEGER NOT NULL, preview TEXT NOT NULL, "
+            "ingested_at REAL NOT NULL)"
+        )
+        for field in SORT_FIELDS:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_documents_{field} ON documents({field}, document_id)")
+        self._conn.commit()
+
+    def upsert(self, document_id: str, filename: str, file_type: str, size_bytes: int,
+               chunk_count: int, preview: str, ingested_at: Optional[float] = None) -> None:
+        """Record or refresh a document entry"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(document_id, filename, file_type, size_bytes, chunk_count, preview, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document_id, filename, file_type, size_bytes, chunk_count, preview,
+                 ingested_at if ingested_at is not None else time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, document_id: str) -> None:
+        """Remove a document entry"""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove all document entries"""
+        with self._lock:
+            self._conn.execute("DELETE FROM documents")
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Number of cataloged documents"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def list(self, limit: int = 50, cursor: Optional[str] = None, sort: str = 'ingested_at',
+             order: str = 'desc', filename: Optional[str] = None,
+             include_total: Optional[bool] = None) -> Dict[str, Any]:
+        """Return one page of documents using keyset (cursor) pagination
+
+        The matching total costs a full count, so by default it is only
+        computed for the first page; later pages return total None unless
+        include_total is set.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Unsupported sort order: {order}")
+        limit = max(1, min(limit, 500))
+        if include_total is None:
+            include_total = not cursor
+
+        where, params = [], []
+        if filename:
+            escaped = filename.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where.append("filename LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        total_where = " AND ".join(where)
+        total_params = list(params)
+
+        if cursor:
+            last_value, last_id = self._decode_cursor(cursor)
+            op = '<' if order == 'desc' else '>'
+            where.append(f"({sort} {op} ? OR ({sort} = ? AND document_id {op} ?))")
+            params.extend([last_value, last_value, last_id])
+
+        direction = order.upper()
+        sql = "SELECT * FROM documents"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {sort} {direction}, document_id {direction} LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            total = None
+            if include_total:
+                total = self._conn.execute(
+                    "SELECT COUNT(*) FROM documents" + (f" WHERE {total_where}" if total_where else ""), total_params
+                ).fetchone()[0]
+
+        documents = [self._to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = base64.urlsafe_b64encode(
+                json.dumps([last[sort], last['document_id']]).encode('utf-8')
+            ).decode('ascii')
+
+        return {"documents": documents, "next_cursor": next_cursor, "total": total}
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        """Decode a [sort value, document_id] cursor, raising ValueError for anything else"""
+        try:
+            decoded = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, UnicodeError) as e:
+            raise ValueError(f"Invalid cursor: {e}")
+        if (not isinstance(decoded, list) or len(decoded) != 2 or not isinstance(decoded[1], str)
+                or not isinstance(decoded[0], (str, int, float)) or isinstance(decoded[0], bool)):
+            raise ValueError("Invalid cursor")
+        return decoded[0], decoded[1]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row['document_id'],
+            "filename": row['filename'],
+            "file_type": row['file_type'],
+            "size_bytes": row['size_bytes'],
+            "chunk_count": row['chunk_count'],
+            "content_preview": row['preview'],
+            "ingested_at": row['ingested_at']
+        }
@@ -0,0 +1,154 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import List, Dict, Any, Optional
+from core.cache import LRUCache
+
+
+class CachedEmbeddingFunction:
+    """Embedding function wrapper with an in-memory LRU tier and a SQLite disk tier"""
+
+    def __init__(self, embedding_function, cache_path: str = "../storage/cache/embeddings.sqlite3",
+                 memory_entries: int = 4096, max_disk_entries: int = 100000, model_id: Optional[str] = None):
+        self.embedding_function = embedding_function
+        self.model_id = model_id or getattr(embedding_function, 'MODEL_NAME', type(embedding_function).__name__)
+        self.max_disk_entries = max_disk_entries
+        self.memory = LRUCache(max_entries=memory_entries)
+        self.disk_hits = 0
+        self.misses = 0
+        self.computed = 0
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        # Running row count, so enforcing the cap does not scan the table on every store
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        """Embed texts, running the wrapped model only for cache misses"""
+        keys = [self._key(text) for text in input]
+        results: List[Optional[List[float]]] = [None] * len(input)
+
+        # Memory tier
+        pending = []
+        for i, key in enumerate(keys):
+            vector = self.memory.get(key)
+            if vector is not None:
+                results[i] = vector
+            else:
+                pending.append(i)
+
+        # Disk tier
+        if pending:
+            found = self._load([keys[i] for i in pending])
+            still_missing = []
+            for i in pending:
+                vector = found.get(keys[i])
+                if vector is not None:
+                    results[i] = vector
+                    self.memory.set(keys[i], vector)
+                else:
+                    still_missing.append(i)
+            with self._lock:
+                self.disk_hits += len(pending) - len(still_missing)
+            pending = still_missing
+
+        # Model inference, once per distinct text
+        if pending:
+            unique = {}
+            for i in pending:
+                unique.setdefault(keys[i], input[i])
+            with self._lock:
+                self.misses += len(pending)
+            vectors = self.embedding_function(list(unique.values()))
+            computed = {}
+            for key, vector in zip(unique.keys(), vectors):
+                computed[key] = [float(x) for x in vector]
+                self.memory.set(key, computed[key])
+            self._store(computed)
+            for i in pending:
+                results[i] = computed[keys[i]]
+
+        return results
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode('utf-8')).hexdigest()
+
+    def _load(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch vectors from the disk tier and refresh their last-used time"""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array('f', blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        """Persist new vectors and enforce the disk size cap"""
+        now = time.time()
+        keys = list(vectors)
+        with self._lock:
+            self.computed += len(vectors)
+            # Another thread may have stored the same text meanwhile; replacing it adds no row
+            existing = 0
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                existing += self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array('f', vector).tobytes(), now) for key, vector in vectors.items()]
+            )
+            self._disk_entries += len(keys) - existing
+            if self._disk_entries > self.max_disk_entries:
+                # Evict down to 90% of the cap so eviction is not triggered on every insert
+                excess = self._disk_entries - int(self.max_disk_entries * 0.9)
+                self._disk_entries -= self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                ).rowcount
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit rates for the memory and disk tiers"""
+        memory_stats = self.memory.get_stats()
+        with self._lock:
+            disk_hits, misses, computed = self.disk_hits, self.misses, self.computed
+            disk_entries = self._disk_entries
+        lookups = memory_stats["hits"] + disk_hits + misses
+        return {
+            "model_id": self.model_id,
+            "lookups": lookups,
+            "memory_hits": memory_stats["hits"],
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "embeddings_computed": computed,
+            "hit_rate": round((memory_stats["hits"] + disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": memory_stats["entries"],
+            "disk_entries": disk_entries,
+            "max_disk_entries": self.max_disk_entries
+        }
@@ -13,6 +13,8 @@ from datetime import datetime
 class ExportService:
     """Enhanced export service supporting multiple formats"""
     
+    SUPPORTED_FORMATS = ('csv', 'txt', 'json', 'pdf', 'xlsx', 'docx')
+    
     def __init__(self, storage_path: str = "../storage/exports"):
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
@@ -0,0 +1,208 @@
+import os
+import io
+import time
+import zipfile
+import itertools
+import PyPDF2
+import openpyxl
+import pandas as pd
+from docx import Document
+from typing import List, Dict, Any, Optional, Iterator, Union, Tuple
+
+# Text extraction helpers. This module is imported by extraction worker
+# processes, so it must stay free of heavy module-level state (no ChromaDB
+# clients or service instances).
+
+SUPPORTED_FILE_TYPES = ('.pdf', '.docx', '.xlsx', '.txt', '.md', '.csv')
+
+
+def read_bytes(source: Union[bytes, str]) -> bytes:
+    """Return file content from raw bytes or a path on disk"""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    return source
+
+
+def extract_pdf_page_range(path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Extract a range of PDF pages in a worker process"""
+    reader = PyPDF2.PdfReader(path)
+    return [
+        {"text": reader.pages[i].extract_text() or "", "page": i + 1}
+        for i in range(start, end)
+    ]
+
+
+def iter_pdf_pages(source: Union[bytes, str]) -> Iterator[Dict[str, Any]]:
+    """Yield PDF text one page at a time"""
+    reader = PyPDF2.PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+    for page_number, page in enumerate(reader.pages, start=1):
+        yield {"text": page.extract_text() or "", "page": page_number}
+
+
+def iter_docx_paragraphs(source: Union[bytes, str], paragraphs_per_segment: int = 50) -> Iterator[Dict[str, Any]]:
+    """Yield DOCX text in groups of paragraphs"""
+    doc = Document(source if isinstance(source, str) else io.BytesIO(source))
+    group, first = [], 1
+    for index, paragraph in enumerate(doc.paragraphs, start=1):
+        if not group:
+            first = index
+        group.append(paragraph.text)
+        if len(group) >= paragraphs_per_segment:
+            yield {"text": "\n".join(group), "paragraph": first}
+            group = []
+    if group:
+        yield {"text": "\n".join(group), "paragraph": first}
+
+
+def _window_rows(rows: Iterator[Tuple[int, str]], header: str, max_tokens: int,
+                 extra: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Group table rows into token-bounded chunks that each repeat the header
+
+    Windows within max_tokens are atomic. A row too long to fit even on its
+    own (or a header that alone exceeds the budget) yields a non-atomic
+    window, which the chunker splits like ordinary text so nothing is lost to
+    embedder truncation.
+    """
+    header_tokens = len(header.split())
+    window, tokens, row_start, row_end = [], header_tokens, None, None
+    for row_number, row_text in rows:
+        row_tokens = len(row_text.split())
+        if window and tokens + row_tokens > max_tokens:
+            yield dict(extra, text=header + "\n" + "\n".join(window), row_start=row_start,
+                       row_end=row_end, atomic=tokens <= max_tokens)
+            window, tokens = [], header_tokens
+        if not window:
+            row_start = row_number
+        window.append(row_text)
+        tokens += row_tokens
+        row_end = row_number
+    if window:
+        yield dict(extra, text=header + "\n" + "\n".join(window), row_start=row_start,
+                   row_end=row_end, atomic=tokens <= max_tokens)
+
+
+def _format_cells(values) -> str:
+    return "\t".join("" if value is None else str(value) for value in values)
+
+
+def iter_xlsx_rows(source: Union[bytes, str], max_tokens: int = 180) -> Iterator[Dict[str, Any]]:
+    """Stream XLSX sheets in read-only mode as header-prefixed row windows"""
+    wb = openpyxl.load_workbook(source if isinstance(source, str) else io.BytesIO(source),
+                                read_only=True, data_only=True)
+    try:
+        for sheet in wb.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header_row = next(rows, None)
+            if header_row is None:
+                continue
+            header = f"Sheet: {sheet.title}\n{_format_cells(header_row)}"
+            numbered = (
+                (row_number, _format_cells(row))
+                for row_number, row in enumerate(rows, start=2)
+                if any(value is not None for value in row)
+            )
+            yield from _window_rows(numbered, header, max_tokens, {"sheet": sheet.title})
+    finally:
+        wb.close()
+
+
+def iter_csv_rows(source: Union[bytes, str], max_tokens: int = 180,
+                  read_rows: int = 5000) -> Iterator[Dict[str, Any]]:
+    """Stream a CSV file in pandas chunks as header-prefixed row windows"""
+    reader = pd.read_csv(
+        source if isinstance(source, str) else io.BytesIO(source),
+        chunksize=read_rows, dtype=str, keep_default_na=False, encoding='utf-8'
+    )
+    first_frame = next(reader, None)
+    if first_frame is None:
+        return
+    header = "\t".join(str(column) for column in first_frame.columns)
+
+    def numbered_rows():
+        row_number = 2
+        for frame in itertools.chain([first_frame], reader):
+            for values in frame.itertuples(index=False, name=None):
+                yield row_number, "\t".join(values)
+                row_number += 1
+
+    yield from _window_rows(numbered_rows(), header, max_tokens, {})
+
+
+def iter_segments(source: Union[bytes, str], file_type: str, max_tokens: int = 180) -> Optional[Iterator[Dict[str, Any]]]:
+    """Stream text as location-tagged segments (pages, paragraph groups, row windows or whole text)
+
+    Tabular formats yield row windows of at most max_tokens that are marked
+    atomic: they are stored as chunks as-is rather than re-split. Oversized
+    single-row windows are left non-atomic so the chunker splits them.
+    """
+    if file_type == '.pdf':
+        return iter_pdf_pages(source)
+    elif file_type == '.docx':
+        return iter_docx_paragraphs(source)
+    elif file_type == '.xlsx':
+        return iter_xlsx_rows(source, max_tokens)
+    elif file_type in ['.txt', '.md']:
+        return iter([{"text": read_bytes(source).decode('utf-8')}])
+    elif file_type == '.csv':
+        return iter_csv_rows(source, max_tokens)
+    return None
+
+
+def extract_file(path: str, file_type: str, max_tokens: int = 180) -> Tuple[List[Dict[str, Any]], float]:
+    """Extract all segments of a file and the seconds it took; entry point for bulk extraction workers
+
+    The whole file is held in memory and pickled back to the parent, so bulk
+    ingestion only sends files up to RAGService.bulk_stream_bytes here.
+    """
+    started = time.perf_counter()
+    segments = iter_segments(path, file_type, max_tokens)
+    if segments is None:
+        raise ValueError(f"Unsupported file type: {file_type}")
+    segments = list(segments)
+    return segments, time.perf_counter() - started
+
+
+def expand_zip(zip_path: str, dest_dir: str, max_total_bytes: int = 512 * 1024 * 1024,
+               max_members: int = 1000) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """Unpack supported files from a ZIP archive
+
+    Returns (path, filename) pairs for extracted files and the names of skipped
+    members. Files are written under dest_dir by base name, so archive entries
+    cannot escape it; the returned filename keeps the member's archive path so
+    same-named files in different folders stay distinct documents. Archives with more than max_members supported
+    files, or that expand past max_total_bytes, raise ValueError; the declared
+    sizes are checked up front and the bytes actually written while unpacking.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    extracted, skipped = [], []
+    with zipfile.ZipFile(zip_path) as archive:
+        members = []
+        for index, member in enumerate(archive.infolist()):
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not name or name.startswith('.') or '__MACOSX' in member.filename:
+                continue
+            if os.path.splitext(name)[1].lower() not in SUPPORTED_FILE_TYPES:
+                skipped.append(member.filename)
+                continue
+            members.append((index, name, member))
+        if len(members) > max_members:
+            raise ValueError(f"Archive has {len(members)} files, the limit is {max_members}")
+        if sum(member.file_size for _, _, member in members) > max_total_bytes:
+            raise ValueError(f"Archive expands past the {max_total_bytes} byte limit")
+
+        # Declared sizes can lie, so count what is really written too
+        written = 0
+        for index, name, member in members:
+            path = os.path.join(dest_dir, f"{index}_{name}")
+            with archive.open(member) as src, open(path, 'wb') as dst:
+                while True:
+                    block = src.read(1024 * 1024)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > max_total_bytes:
+                        raise ValueError(f"Archive expands past the {max_total_bytes} byte limit")
+                    dst.write(block)
+            extracted.append((path, member.filename))
+    return extracted, skipped
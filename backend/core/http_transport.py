@@ -0,0 +1,80 @@
+import os
+import httpx
+from typing import Dict, Any, Optional, AsyncIterator, Tuple, Callable
+from urllib.parse import urlsplit
+
+
+class AsyncHTTPTransport:
+    """Non-blocking HTTP transport with a keep-alive connection pool per upstream host
+
+    on_response, if given, is called with (url, response) for every response
+    received, before its body is consumed, unless the request opts out.
+    """
+
+    def __init__(self, connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None,
+                 max_connections: Optional[int] = None,
+                 on_response: Optional[Callable[[str, httpx.Response], None]] = None):
+        self.on_response = on_response
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout or float(os.getenv('LLM_CONNECT_TIMEOUT', 5)),
+            read=read_timeout or float(os.getenv('LLM_READ_TIMEOUT', 60)),
+            write=10.0,
+            pool=10.0
+        )
+        max_connections = max_connections or int(os.getenv('LLM_MAX_CONNECTIONS', 50))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Return the pooled client for the URL's host, creating it on first use"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._clients[origin] = client
+        return client
+
+    async def post(self, url: str, headers: Optional[Dict[str, str]] = None,
+                   json: Optional[Any] = None, notify: bool = True) -> httpx.Response:
+        """POST over the host's pooled connection; notify=False skips the on_response hook"""
+        response = await self.client_for(url).post(url, headers=headers, json=json)
+        if notify:
+            self._notify(url, response)
+        return response
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+                  params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """GET over the host's pooled connection"""
+        response = await self.client_for(url).get(url, headers=headers, params=params)
+        self._notify(url, response)
+        return response
+
+    async def stream_lines(self, url: str, headers: Optional[Dict[str, str]] = None,
+                           json: Optional[Any] = None) -> AsyncIterator[Tuple[int, str]]:
+        """POST and yield (status_code, line) pairs as the response body arrives
+
+        For non-200 responses the full body is yielded as a single line.
+        """
+        async with self.client_for(url).stream("POST", url, headers=headers, json=json) as response:
+            self._notify(url, response)
+            if response.status_code != 200:
+                body = await response.aread()
+                yield response.status_code, body.decode('utf-8', errors='replace')
+                return
+            async for line in response.aiter_lines():
+                yield response.status_code, line
+
+    def _notify(self, url: str, response: httpx.Response) -> None:
+        if self.on_response is not None:
+            self.on_response(url, response)
+
+    async def aclose(self) -> None:
+        """Close all pooled connections"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
@@ -0,0 +1,102 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+
+class IngestionJobManager:
+    """Bounded background worker pool that runs file ingestion jobs and tracks their progress"""
+
+    def __init__(self, rag_service, max_workers: int = 2, max_queued: int = 100, max_retained: int = 500):
+        self.rag_service = rag_service
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, temp_path: str, filename: str, file_type: str) -> Optional[Dict[str, Any]]:
+        """Queue a stored upload for ingestion; returns None when the queue is full"""
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+            if active >= self.max_queued:
+                return None
+            job_id = uuid.uuid4().hex
+            job = {
+                "job_id": job_id,
+                "filename": filename,
+                "file_type": file_type,
+                "status": "queued",
+                "progress": {"pages_parsed": 0, "chunks_embedded": 0},
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None
+            }
+            self._jobs[job_id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job_id, temp_path, filename, file_type)
+        return self.get_job(job_id)
+
+    def _run(self, job_id: str, temp_path: str, filename: str, file_type: str) -> None:
+        self._update(job_id, status="running", started_at=time.time())
+        try:
+            result = self.rag_service.process_file(
+                temp_path, filename, file_type,
+                progress=lambda progress: self._update(job_id, progress=progress)
+            )
+            if result["success"]:
+                self._update(job_id, status="completed", result=result, finished_at=time.time())
+            else:
+                self._update(job_id, status="failed", error=result["error"], finished_at=time.time())
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond max_retained"""
+        excess = len(self._jobs) - self.max_retained
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]["status"] in ("completed", "failed"):
+                del self._jobs[job_id]
+                excess -= 1
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a snapshot of a job's state"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job, progress=dict(job["progress"]))
+        if snapshot["started_at"]:
+            snapshot["elapsed_seconds"] = round((snapshot["finished_at"] or time.time()) - snapshot["started_at"], 3)
+        return snapshot
+
+    def list_jobs(self) -> list:
+        """Return snapshots of all retained jobs, newest first"""
+        with self._lock:
+            job_ids = list(self._jobs)
+        return [job for job in (self.get_job(job_id) for job_id in reversed(job_ids)) if job]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Number of retained jobs in each status"""
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+        return counts
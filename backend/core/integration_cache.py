@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, Callable, Tuple
+
+# Seconds a cached response is served without contacting the upstream
+DEFAULT_TTLS = {
+    ('woocommerce', 'orders'): 120,
+    ('woocommerce', 'customers'): 600,
+    ('woocommerce', 'products'): 600,
+    ('woocommerce', 'reports'): 900,
+    ('merchantguy', 'transactions'): 120,
+    ('merchantguy', 'reports'): 900,
+    ('merchantguy', 'analytics'): 900
+}
+
+# fetch(conditional_headers) -> (status_code, payload, etag, last_modified); status 304 means "unchanged"
+Fetch = Callable[[Dict[str, str]], Tuple[int, Optional[Dict[str, Any]], Optional[str], Optional[str]]]
+
+
+class IntegrationCache:
+    """Persistent read-through cache for integration GETs
+
+    Entries are keyed by platform, action and normalized params. Within its
+    TTL an entry is served directly. For swr_seconds after that it is served
+    immediately while a background refresh revalidates it (stale-while-
+    revalidate). Older entries are revalidated synchronously with
+    If-None-Match / If-Modified-Since, and served stale if the upstream fails
+    or does not answer within fetch_timeout.
+
+    Storage is bounded: least recently used entries are evicted beyond
+    max_bytes of payload, and entries more than max_stale_seconds past expiry
+    are swept every sweep_interval seconds.
+    """
+
+    def __init__(self, cache_path: str = "../storage/cache/integrations.sqlite3",
+                 ttls: Optional[Dict[Tuple[str, str], float]] = None, default_ttl: float = 300,
+                 swr_seconds: float = 600, max_bytes: int = 256 * 1024 * 1024, max_stale_seconds: float = 86400,
+                 fetch_timeout: float = 10, sweep_interval: float = 300):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.swr_seconds = swr_seconds
+        self.max_bytes = max_bytes
+        self.max_stale_seconds = max_stale_seconds
+        self.fetch_timeout = fetch_timeout
+        self.sweep_interval = sweep_interval
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stale_served = 0
+        self.slow_upstream = 0
+        self.refresh_errors = 0
+        self.evicted = 0
+        self.last_error: Optional[str] = None
+        self._last_sweep = 0.0
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, platform TEXT NOT NULL, action TEXT NOT NULL, payload TEXT NOT NULL, "
+            "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, expires_at REAL NOT NULL, "
+            "size INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "size" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("ALTER TABLE responses ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE responses SET size = LENGTH(payload), last_used = fetched_at")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses(expires_at)")
+        self._conn.commit()
+        self._refreshing = set()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="integration-refresh")
+
+    @staticmethod
+    def make_key(platform: str, action: str, params: Optional[Dict[str, Any]] = None) -> str:
+        normalized = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+        digest = hashlib.sha256(json.dumps(normalized).encode('utf-8')).hexdigest()[:32]
+        return f"{platform}:{action}:{digest}"
+
+    def ttl_for(self, platform: str, action: str) -> float:
+        return self.ttls.get((platform, action), self.default_ttl)
+
+    def get_or_fetch(self, platform: str, action: str, params: Optional[Dict[str, Any]], fetch: Fetch,
+                     use_cache: bool = True) -> Dict[str, Any]:
+        """Return the payload for a request, from the cache or the upstream, with a "cache" field"""
+        key = self.make_key(platform, action, params)
+        row = self._load(key) if use_cache else None
+        now = time.time()
+
+        if row and now < row["expires_at"]:
+            self.hits += 1
+            return self._serve(row, "hit", now)
+
+        if row and now < row["expires_at"] + self.swr_seconds:
+            self.stale_served += 1
+            self._refresh_in_background(key, platform, action, row, fetch)
+            return self._serve(row, "stale", now)
+
+        if row is None:
+            fresh = self._revalidate(key, platform, action, None, fetch)
+            self.misses += 1
+            return self._serve(fresh, "miss", now)
+
+        # A slow upstream must not block callers that have a copy to fall back to
+        future = self._refresh_pool.submit(self._revalidate, key, platform, action, row, fetch)
+        try:
+            fresh = future.result(timeout=self.fetch_timeout)
+            self.misses += 1
+            return self._serve(fresh, "revalidated" if fresh.get("revalidated") else "miss", now)
+        except FutureTimeoutError:
+            # The fetch keeps running and updates the entry when it completes
+            future.add_done_callback(lambda done: self._record_refresh_error(platform, action, done))
+            self.slow_upstream += 1
+            self.stale_served += 1
+            return self._serve(row, "stale", now)
+        except Exception as e:
+            # Offline-first: any cached copy beats an error
+            self.last_error = f"{platform}/{action}: {e}"
+            self.stale_served += 1
+            return self._serve(row, "stale", now)
+
+    def _revalidate(self, key: str, platform: str, action: str, row: Optional[Dict[str, Any]],
+                    fetch: Fetch) -> Dict[str, Any]:
+        headers = {}
+        if row and row["etag"]:
+            headers["If-None-Match"] = row["etag"]
+        if row and row["last_modified"]:
+            headers["If-Modified-Since"] = row["last_modified"]
+        status, payload, etag, last_modified = fetch(headers)
+        now = time.time()
+        expires_at = now + self.ttl_for(platform, action)
+        if status == 304 and row:
+            self.revalidated += 1
+            with self._lock:
+                self._conn.execute("UPDATE responses SET fetched_at = ?, expires_at = ?, last_used = ? WHERE key = ?",
+                                   (now, expires_at, now, key))
+                self._conn.commit()
+            return dict(row, fetched_at=now, expires_at=expires_at, revalidated=True)
+        encoded = json.dumps(payload)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, platform, action, payload, etag, last_modified, fetched_at, expires_at, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, platform, action, encoded, etag, last_modified, now, expires_at, len(encoded), now)
+            )
+            self._enforce_limits(now)
+            self._conn.commit()
+        return {"payload": payload, "etag": etag, "last_modified": last_modified,
+                "fetched_at": now, "expires_at": expires_at}
+
+    def _enforce_limits(self, now: float) -> None:
+        """Sweep long-expired entries periodically and evict LRU entries beyond max_bytes; caller holds _lock"""
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.evicted += self._conn.execute(
+                "DELETE FROM responses WHERE expires_at < ?", (now - self.max_stale_seconds,)
+            ).rowcount
+        excess = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evicted += len(victims)
+
+    def _record_refresh_error(self, platform: str, action: str, future) -> None:
+        error = future.exception()
+        if error is not None:
+            self.refresh_errors += 1
+            self.last_error = f"{platform}/{action}: {error}"
+
+    def _refresh_in_background(self, key: str, platform: str, action: str, row: Dict[str, Any],
+                               fetch: Fetch) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._revalidate(key, platform, action, row, fetch)
+            except Exception as e:
+                self.refresh_errors += 1
+                self.last_error = f"{platform}/{action}: {e}"
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_pool.submit(refresh)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, etag, last_modified, fetched_at, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        if not row:
+            return None
+        return {"payload": json.loads(row[0]), "etag": row[1], "last_modified": row[2],
+                "fetched_at": row[3], "expires_at": row[4]}
+
+    @staticmethod
+    def _serve(row: Dict[str, Any], status: str, now: float) -> Dict[str, Any]:
+        return {**row["payload"], "cache": {"status": status, "age_seconds": round(max(0.0, now - row["fetched_at"]), 1)}}
+
+    def invalidate(self, platform: Optional[str] = None) -> int:
+        """Drop cached responses for one platform, or all of them"""
+        with self._lock:
+            if platform:
+                deleted = self._conn.execute("DELETE FROM responses WHERE platform = ?", (platform,)).rowcount
+            else:
+                deleted = self._conn.execute("DELETE FROM responses").rowcount
+            self._conn.commit()
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.stale_served + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+            "slow_upstream": self.slow_upstream,
+            "last_error": self.last_error,
+            "hits": self.hits,
+            "stale_served": self.stale_served,
+            "misses": self.misses,
+            "revalidated_not_modified": self.revalidated,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": round((self.hits + self.stale_served) / lookups, 4) if lookups else 0.0
+        }
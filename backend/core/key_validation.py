@@ -0,0 +1,78 @@
+import os
+import time
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+from core.cache import LRUCache
+
+
+class KeyValidator:
+    """Validates LLM and integration API keys concurrently, caching verdicts by key hash
+
+    Only definitive verdicts are cached: validators return a bool for an
+    accepted or rejected key and raise for anything inconclusive (timeouts,
+    rate limits, upstream errors), which is retried on the next check. Keys
+    themselves are never stored, only a SHA-256 of them.
+    """
+
+    def __init__(self, llm_service, api_service, ttl: Optional[float] = None, timeout: Optional[float] = None):
+        self.llm_service = llm_service
+        self.api_service = api_service
+        self.timeout = timeout or float(os.getenv('KEY_VALIDATION_TIMEOUT', 10))
+        self.cache = LRUCache(max_entries=256, ttl=ttl or float(os.getenv('KEY_VALIDATION_TTL', 3600)))
+
+    @staticmethod
+    def _cache_key(kind: str, name: str, api_key: str) -> str:
+        return f"{kind}:{name}:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()}"
+
+    async def validate(self, kind: str, name: str, api_key: str, refresh: bool = False) -> Dict[str, Any]:
+        """Validate one key; kind is "llm" or "integration" """
+        cache_key = self._cache_key(kind, name, api_key)
+        if not refresh:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return {**cached, "latency_ms": 0.0, "cached": True}
+
+        started = time.perf_counter()
+        result = {"kind": kind, "name": name, "valid": False, "error": None}
+        try:
+            if kind == 'llm':
+                check = self.llm_service.validate_api_key(name, api_key)
+            else:
+                check = asyncio.to_thread(self.api_service.validate_api_key, name, api_key)
+            result["valid"] = bool(await asyncio.wait_for(check, timeout=self.timeout))
+            self.cache.set(cache_key, result)
+        except asyncio.TimeoutError:
+            result["error"] = f"Validation timed out after {self.timeout:g}s"
+        except Exception as e:
+            result["error"] = str(e)
+        return {**result, "latency_ms": round((time.perf_counter() - started) * 1000, 1), "cached": False}
+
+    def configured_keys(self) -> List[Tuple[str, str, str]]:
+        """(kind, name, api_key) for every LLM key in the environment and every saved integration key"""
+        keys = []
+        for provider, env in self.llm_service.API_KEY_ENV.items():
+            api_key = os.getenv(env)
+            if api_key:
+                keys.append(("llm", provider, api_key))
+        for config_key, api_key in self.api_service.api_keys.items():
+            if config_key.endswith("_api_key") and api_key:
+                keys.append(("integration", config_key[:-len("_api_key")], api_key))
+        return keys
+
+    async def validate_all(self, keys: Optional[List[Tuple[str, str, str]]] = None,
+                           refresh: bool = False) -> Dict[str, Any]:
+        """Validate the given keys (default: all configured keys) concurrently"""
+        keys = self.configured_keys() if keys is None else keys
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self.validate(kind, name, api_key, refresh) for kind, name, api_key in keys))
+        return {
+            "results": results,
+            "checked": len(results),
+            "cached": sum(1 for result in results if result["cached"]),
+            "valid": sum(1 for result in results if result["valid"]),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.cache.get_stats()
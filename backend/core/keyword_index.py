@@ -0,0 +1,143 @@
+import os
+import re
+import math
+import sqlite3
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+
+# Keeps SKU- and order-number-like tokens (e.g. "WC-1042", "sku_88/b") intact
+# while also indexing their alphanumeric parts.
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[-_./#][a-z0-9]+)*')
+_PART_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase keyword tokens, with compound identifiers also split into parts"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict[str, Any]]], n_results: int,
+                           k: int = 60) -> List[Dict[str, Any]]:
+    """Combine ranked lists of chunk dicts (id, text, metadata) with reciprocal rank fusion"""
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            entry = fused.get(chunk["id"])
+            if entry is None:
+                entry = fused[chunk["id"]] = dict(chunk, score=0.0)
+            elif entry["text"] is None and chunk["text"] is not None:
+                entry.update(text=chunk["text"], metadata=chunk["metadata"])
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda chunk: chunk["score"], reverse=True)[:n_results]
+
+
+class KeywordIndex:
+    """On-disk inverted index with BM25 scoring, kept alongside the Chroma collection"""
+
+    def __init__(self, index_path: str = "../storage/rag/keyword_index.sqlite3", k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, chunk_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id)")
+        self._conn.commit()
+        self._chunk_count, self._total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+        ).fetchone()
+
+    def add(self, chunks: List[Tuple[str, str, str]]) -> None:
+        """Index (chunk_id, document_id, text) tuples"""
+        with self._lock:
+            for chunk_id, document_id, text in chunks:
+                terms = Counter(tokenize(text))
+                length = sum(terms.values())
+                previous = self._conn.execute("SELECT length FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if previous:
+                    self._remove(chunk_id, previous[0])
+                self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, document_id, length) VALUES (?, ?, ?)",
+                    (chunk_id, document_id, length)
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in terms.items()]
+                )
+                self._chunk_count += 1
+                self._total_length += length
+            self._conn.commit()
+
+    def delete(self, chunk_ids: List[str]) -> None:
+        """Remove chunks from the index"""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                row = self._conn.execute("SELECT length FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if row:
+                    self._remove(chunk_id, row[0])
+            self._conn.commit()
+
+    def _remove(self, chunk_id: str, length: int) -> None:
+        self._conn.execute("DELETE FROM postings WHERE chunk_id = ?", (chunk_id,))
+        self._conn.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id,))
+        self._chunk_count -= 1
+        self._total_length -= length
+
+    def clear(self) -> None:
+        """Remove every chunk from the index"""
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+            self._chunk_count, self._total_length = 0, 0
+
+    def count(self) -> int:
+        """Number of indexed chunks"""
+        return self._chunk_count
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Return (chunk_id, bm25_score) pairs, best first"""
+        terms = set(tokenize(query))
+        if not terms or not self._chunk_count:
+            return []
+
+        scores: Dict[str, float] = {}
+        with self._lock:
+            n = self._chunk_count
+            avg_length = self._total_length / n if n else 0.0
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p "
+                    "JOIN chunks c ON c.chunk_id = p.chunk_id WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+                for chunk_id, tf, length in rows:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return index size statistics"""
+        return {
+            "chunks": self._chunk_count,
+            "avg_chunk_length": round(self._total_length / self._chunk_count, 1) if self._chunk_count else 0.0
+        }
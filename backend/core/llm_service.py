@@ -1,15 +1,66 @@
 import os
-import requests
+import math
+import time
+import asyncio
+import hashlib
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, Callable, List
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
+from core.http_transport import AsyncHTTPTransport
+from core.response_cache import ResponseCache
+from core.provider_health import ProviderHealth
+from core.single_flight import SingleFlight
+from core.rate_limiter import GovernorRegistry, QueueFullError, governors
 
 load_dotenv()
 
+def is_error_response(response: str) -> bool:
+    """Whether a provider result is one of the service's error strings"""
+    return response.startswith("[ERROR") or response.startswith("[EXCEPTION")
+
 class LLMService:
     """Centralized LLM service supporting multiple providers"""
     
-    def __init__(self):
+    # Defaults used when a caller does not pick a specific model or key
+    DEFAULT_MODELS = {
+        'openai': 'gpt-4o',
+        'claude': 'claude-3-5-sonnet-20240620',
+        'gemini': 'gemini-pro',
+        'groq': 'mixtral-8x7b-32768',
+        'deepseek': 'deepseek-chat',
+        'qwen': 'qwen-turbo'
+    }
+    API_KEY_ENV = {
+        'openai': 'OPENAI_API_KEY',
+        'claude': 'CLAUDE_API_KEY',
+        'gemini': 'GEMINI_API_KEY',
+        'groq': 'GROQ_API_KEY',
+        'deepseek': 'DEEPSEEK_API_KEY',
+        'qwen': 'QWEN_API_KEY'
+    }
+    PROVIDER_HOSTS = {
+        'api.openai.com': 'openai',
+        'api.anthropic.com': 'claude',
+        'generativelanguage.googleapis.com': 'gemini',
+        'api.groq.com': 'groq',
+        'api.deepseek.com': 'deepseek',
+        'dashscope.aliyuncs.com': 'qwen'
+    }
+    MAX_OUTPUT_TOKENS = 1000
+    
+    def __init__(self, transport: Optional[AsyncHTTPTransport] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 rate_limits: Optional[GovernorRegistry] = None):
+        self.transport = transport or AsyncHTTPTransport()
+        if self.transport.on_response is None:
+            self.transport.on_response = self._on_response
+        self.response_cache = response_cache
+        self.rate_limits = rate_limits or governors
+        self.health = {provider: ProviderHealth() for provider in self.DEFAULT_MODELS}
+        self.fallbacks = 0
+        self.single_flight = SingleFlight()
+        self.hedges_fired = 0
         self.providers = {
             'openai': self._call_openai,
             'claude': self._call_claude,
@@ -18,21 +69,198 @@ class LLMService:
             'deepseek': self._call_deepseek,
             'qwen': self._call_qwen
         }
+        self.stream_providers = {
+            'openai': self._stream_openai,
+            'claude': self._stream_claude,
+            'gemini': self._stream_gemini,
+            'groq': self._stream_groq,
+            'deepseek': self._stream_deepseek,
+            'qwen': self._stream_qwen
+        }
     
-    async def send_request(self, provider: str, model: str, prompt: str, api_key: str, context: str = '') -> str:
-        """Send request to specified LLM provider"""
+    async def send_request(self, provider: str, model: Optional[str] = None, prompt: str = '',
+                           api_key: Optional[str] = None, context: str = '', use_cache: bool = True,
+                           shared: bool = True) -> str:
+        """Send request to specified LLM provider
+
+        model and api_key fall back to the provider's default model and its
+        API key from the environment. Responses are served from and stored in
+        the response cache unless use_cache is False. shared=False skips
+        single-flight, so cancelling the caller cancels the upstream call.
+        """
         try:
             if provider not in self.providers:
                 return f"[ERROR] Unsupported provider: {provider}"
             
-            # Enhance prompt with context if provided
-            enhanced_prompt = f"Context: {context}\n\nQuery: {prompt}" if context else prompt
+            model = model or self.DEFAULT_MODELS[provider]
+            api_key = api_key or os.getenv(self.API_KEY_ENV[provider])
+            if not api_key:
+                return f"[ERROR] No API key configured for {provider}"
             
-            return await self.providers[provider](model, enhanced_prompt, api_key)
+            if not shared:
+                return await self._fetch(provider, model, prompt, api_key, context, use_cache)
+            
+            # Identical concurrent requests share a single upstream call; a cache bypass never joins a
+            # call that may be answered from the cache
+            key = (provider, model, use_cache,
+                   hashlib.sha256(f"{api_key}\0{prompt}\0{context}".encode('utf-8')).hexdigest())
+            return await self.single_flight.do(
+                key, lambda: self._fetch(provider, model, prompt, api_key, context, use_cache)
+            )
             
         except Exception as e:
             return f"[EXCEPTION] {str(e)}"
     
+    async def _fetch(self, provider: str, model: str, prompt: str, api_key: str, context: str,
+                     use_cache: bool) -> str:
+        """Serve a request from the response cache or the provider, recording provider health"""
+        cached = await self._cache_lookup(provider, model, prompt, context, use_cache)
+        if cached:
+            return cached["response"]
+        
+        # Enhance prompt with context if provided
+        enhanced_prompt = f"Context: {context}\n\nQuery: {prompt}" if context else prompt
+        
+        started = time.perf_counter()
+        try:
+            # Waits for a concurrency slot and rate budget; the wait counts toward latency
+            async with self.rate_limits.get(provider).slot(self._estimate_tokens(enhanced_prompt)):
+                response = await self.providers[provider](model, enhanced_prompt, api_key)
+        except QueueFullError as e:
+            return f"[ERROR 429] {str(e)}"
+        except Exception as e:
+            self.health[provider].record(time.perf_counter() - started, False, str(e))
+            raise
+        failed = is_error_response(response)
+        self.health[provider].record(time.perf_counter() - started, not failed, response if failed else None)
+        
+        await self._cache_store(provider, model, prompt, context, response, use_cache)
+        return response
+    
+    def configured_providers(self) -> List[str]:
+        """Providers with an API key available in the environment"""
+        return [provider for provider, env in self.API_KEY_ENV.items() if os.getenv(env)]
+    
+    def fallback_chain(self, primary: str) -> List[str]:
+        """Ordered providers to try: the primary first, then the configured fallbacks by health score
+
+        Fallbacks come from LLM_FALLBACK_CHAIN (default: every provider) and are
+        limited to providers with an API key; ties keep the configured order.
+        """
+        order = [p.strip() for p in os.getenv('LLM_FALLBACK_CHAIN', ','.join(self.providers)).split(',') if p.strip()]
+        configured = set(self.configured_providers())
+        fallbacks = [p for p in order if p != primary and p in configured and p in self.providers]
+        fallbacks.sort(key=lambda provider: self.health[provider].score(), reverse=True)
+        return [primary] + fallbacks
+    
+    async def route_request(self, providers: List[str], prompt: str = '', context: str = '',
+                            hedge: bool = False, use_cache: bool = True) -> Dict[str, Any]:
+        """Send a request along an ordered fallback chain, optionally hedging slow providers
+
+        Providers are tried in order and an error moves on to the next one. With
+        hedge=True, if the in-flight provider has not answered within its observed
+        p95 latency the next provider is started as well (at most two in flight)
+        and whichever answers successfully first wins. Hedged calls bypass
+        single-flight so the losing leg is really cancelled upstream; it is counted
+        as cancelled rather than as a latency or error sample.
+        
+        attempts lists every provider started, with its reason (primary,
+        fallback or hedge), outcome and latency.
+        """
+        attempts = []
+        pending: Dict[asyncio.Task, Dict[str, Any]] = {}
+        remaining = list(providers)
+        last_error = "[ERROR] No providers available"
+        
+        def launch(reason: str):
+            provider = remaining.pop(0)
+            attempt = {"provider": provider, "reason": reason, "started": time.perf_counter()}
+            attempts.append(attempt)
+            task = asyncio.ensure_future(self.send_request(provider, prompt=prompt, context=context,
+                                                           use_cache=use_cache, shared=not hedge))
+            pending[task] = attempt
+        
+        def finish(attempt: Dict[str, Any], **outcome) -> None:
+            attempt.update(outcome, ms=round((time.perf_counter() - attempt.pop("started")) * 1000, 1))
+        
+        try:
+            if remaining:
+                launch("primary")
+            while pending:
+                timeout = None
+                if hedge and remaining and len(pending) < 2:
+                    timeout = self._hedge_delay(next(iter(pending.values()))["provider"])
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # The in-flight provider is slower than its usual p95: hedge with the next one
+                    self.hedges_fired += 1
+                    launch("hedge")
+                    continue
+                
+                # Both legs can finish in the same wakeup: record every outcome before picking a winner
+                winner = None
+                for task in done:
+                    attempt = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        response = f"[ERROR] {e}"
+                    if is_error_response(response):
+                        finish(attempt, ok=False, error=response[:200])
+                        last_error = response
+                    else:
+                        finish(attempt, ok=True)
+                        winner = winner or (response, attempt["provider"])
+                if winner:
+                    return {"response": winner[0], "provider": winner[1], "attempts": attempts}
+                
+                if not pending and remaining:
+                    self.fallbacks += 1
+                    launch("fallback")
+            
+            return {"response": last_error, "provider": None, "attempts": attempts}
+        finally:
+            for task, attempt in pending.items():
+                task.cancel()
+                finish(attempt, ok=None, cancelled=True)
+                # Lost the race: the outcome is unknown, so it is no latency or error sample
+                if attempt["provider"] in self.health:
+                    self.health[attempt["provider"]].record_cancelled()
+    
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Tokens a request may consume: the prompt at ~4 chars per token plus the output cap"""
+        return math.ceil(len(prompt) / 4) + self.MAX_OUTPUT_TOKENS
+    
+    def _on_response(self, url: str, response: Any) -> None:
+        """Feed upstream status codes and Retry-After into the provider's governor"""
+        provider = self.PROVIDER_HOSTS.get(urlsplit(url).hostname or '')
+        if provider:
+            self.rate_limits.get(provider).record(response.status_code, response.headers.get('retry-after'))
+    
+    def _hedge_delay(self, provider: str) -> float:
+        """Seconds to wait before hedging: the provider's observed p95, clamped to a sane range"""
+        p95 = self.health[provider].percentile(0.95)
+        if p95 is None:
+            return float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', 5))
+        return min(max(p95, 0.25), 30.0)
+    
+    async def _cache_lookup(self, provider: str, model: str, prompt: str, context: str,
+                            use_cache: bool) -> Optional[Dict[str, Any]]:
+        if self.response_cache is None:
+            return None
+        if not use_cache:
+            self.response_cache.record_bypass()
+            return None
+        return await asyncio.to_thread(self.response_cache.get, provider, model, prompt, context)
+    
+    async def _cache_store(self, provider: str, model: str, prompt: str, context: str,
+                           response: str, use_cache: bool) -> None:
+        # Error strings are never cached
+        if self.response_cache is None or not use_cache or is_error_response(response):
+            return
+        await asyncio.to_thread(self.response_cache.set, provider, model, prompt, response, context)
+    
     async def _call_openai(self, model: str, prompt: str, api_key: str) -> str:
         """Call OpenAI API"""
         url = "https://api.openai.com/v1/chat/completions"
@@ -43,10 +271,10 @@ class LLMService:
         data = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1000
+            "max_tokens": self.MAX_OUTPUT_TOKENS
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = await self.transport.post(url, headers=headers, json=data)
         if response.status_code != 200:
             return f"[ERROR {response.status_code}] {response.text}"
         
@@ -63,11 +291,11 @@ class LLMService:
         }
         data = {
             "model": model,
-            "max_tokens": 1000,
+            "max_tokens": self.MAX_OUTPUT_TOKENS,
             "messages": [{"role": "user", "content": prompt}]
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = await self.transport.post(url, headers=headers, json=data)
         if response.status_code != 200:
             return f"[ERROR {response.status_code}] {response.text}"
         
@@ -79,10 +307,11 @@ class LLMService:
         url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={api_key}"
         headers = {"Content-Type": "application/json"}
         data = {
-            "contents": [{"parts": [{"text": prompt}]}]
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {"maxOutputTokens": self.MAX_OUTPUT_TOKENS}
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = await self.transport.post(url, headers=headers, json=data)
         if response.status_code != 200:
             return f"[ERROR {response.status_code}] {response.text}"
         
@@ -99,10 +328,10 @@ class LLMService:
         data = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1000
+            "max_tokens": self.MAX_OUTPUT_TOKENS
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = await self.transport.post(url, headers=headers, json=data)
         if response.status_code != 200:
             return f"[ERROR {response.status_code}] {response.text}"
         
@@ -119,10 +348,10 @@ class LLMService:
         data = {
             "model": model,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 1000
+            "max_tokens": self.MAX_OUTPUT_TOKENS
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = await self.transport.post(url, headers=headers, json=data)
         if response.status_code != 200:
             return f"[ERROR {response.status_code}] {response.text}"
         
@@ -139,63 +368,228 @@ class LLMService:
         data = {
             "model": model,
             "input": {"prompt": prompt},
-            "parameters": {"max_tokens": 1000}
+            "parameters": {"max_tokens": self.MAX_OUTPUT_TOKENS}
         }
         
-        response = requests.post(url, headers=headers, json=data)
+        response = await self.transport.post(url, headers=headers, json=data)
         if response.status_code != 200:
             return f"[ERROR {response.status_code}] {response.text}"
         
         result = response.json()
         return result['output']['text']
     
-    def validate_api_key(self, provider: str, api_key: str) -> bool:
-        """Validate API key for a provider"""
+    async def stream_request(self, provider: str, model: Optional[str] = None, prompt: str = '',
+                             api_key: Optional[str] = None, context: str = '',
+                             use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a completion as normalized events
+
+        Yields {"type": "token", "text": ...} as tokens arrive, then a single
+        {"type": "done", ...} event with time-to-first-token and total latency,
+        or {"type": "error", "message": ...} on failure.
+        """
+        started = time.perf_counter()
+        first_token_at = None
         try:
-            # Simple validation by making a minimal request
-            test_prompt = "Hello"
-            if provider == 'openai':
-                response = requests.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": test_prompt}], "max_tokens": 5}
-                )
-            elif provider == 'claude':
-                response = requests.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers={"x-api-key": api_key, "anthropic-version": "2023-06-01", "Content-Type": "application/json"},
-                    json={"model": "claude-3-sonnet-20240229", "max_tokens": 5, "messages": [{"role": "user", "content": test_prompt}]}
-                )
-            elif provider == 'gemini':
-                response = requests.post(
-                    f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={api_key}",
-                    headers={"Content-Type": "application/json"},
-                    json={"contents": [{"parts": [{"text": test_prompt}]}]}
-                )
-            elif provider == 'groq':
-                response = requests.post(
-                    "https://api.groq.com/openai/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={"model": "mixtral-8x7b-32768", "messages": [{"role": "user", "content": test_prompt}], "max_tokens": 5}
-                )
-            elif provider == 'deepseek':
-                response = requests.post(
-                    "https://api.deepseek.com/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={"model": "deepseek-chat", "messages": [{"role": "user", "content": test_prompt}], "max_tokens": 5}
-                )
-            elif provider == 'qwen':
-                response = requests.post(
-                    "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation",
-                    headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                    json={"model": "qwen-turbo", "input": {"prompt": test_prompt}, "parameters": {"max_tokens": 5}}
-                )
-            else:
-                return False
+            if provider not in self.stream_providers:
+                yield {"type": "error", "message": f"Unsupported provider: {provider}"}
+                return
+            
+            model = model or self.DEFAULT_MODELS[provider]
+            api_key = api_key or os.getenv(self.API_KEY_ENV[provider])
+            if not api_key:
+                yield {"type": "error", "message": f"No API key configured for {provider}"}
+                return
             
-            return response.status_code == 200
-        except:
+            cached = await self._cache_lookup(provider, model, prompt, context, use_cache)
+            if cached:
+                yield {"type": "token", "text": cached["response"]}
+                latency_ms = round((time.perf_counter() - started) * 1000, 1)
+                yield {"type": "done", "provider": provider, "model": model, "cached": cached["match"],
+                       "ttft_ms": latency_ms, "total_ms": latency_ms}
+                return
+            
+            enhanced_prompt = f"Context: {context}\n\nQuery: {prompt}" if context else prompt
+            
+            parts = []
+            try:
+                async with self.rate_limits.get(provider).slot(self._estimate_tokens(enhanced_prompt)):
+                    async for text in self.stream_providers[provider](model, enhanced_prompt, api_key):
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        parts.append(text)
+                        yield {"type": "token", "text": text}
+            except QueueFullError:
+                raise
+            except Exception as e:
+                # Streaming traffic feeds the same health stats that drive failover and hedging
+                self.health[provider].record(time.perf_counter() - started, False, str(e))
+                raise
+            self.health[provider].record(time.perf_counter() - started, True)
+            response = "".join(parts)
+            # An empty stream is not an answer worth replaying
+            if response.strip():
+                await self._cache_store(provider, model, prompt, context, response, use_cache)
+            
+            yield {
+                "type": "done",
+                "provider": provider,
+                "model": model,
+                "cached": None,
+                "ttft_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        except Exception as e:
+            yield {"type": "error", "message": str(e)}
+    
+    async def _stream_sse(self, url: str, headers: Dict[str, str], data: Dict[str, Any],
+                          extract: Callable[[Dict[str, Any]], Optional[str]]) -> AsyncIterator[str]:
+        """Relay text deltas from a server-sent-event response"""
+        async for status, line in self.transport.stream_lines(url, headers=headers, json=data):
+            if status != 200:
+                raise RuntimeError(f"[ERROR {status}] {line}")
+            if not line.startswith("data:"):
+                continue
+            payload = line[5:].strip()
+            if not payload or payload == "[DONE]":
+                continue
+            text = extract(json.loads(payload))
+            if text:
+                yield text
+    
+    def _stream_openai_compatible(self, url: str, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.MAX_OUTPUT_TOKENS,
+            "stream": True
+        }
+        return self._stream_sse(
+            url, headers, data,
+            lambda event: (event.get('choices') or [{}])[0].get('delta', {}).get('content')
+        )
+    
+    def _stream_openai(self, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """Stream OpenAI API"""
+        return self._stream_openai_compatible("https://api.openai.com/v1/chat/completions", model, prompt, api_key)
+    
+    def _stream_groq(self, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """Stream Groq API (OpenAI compatible)"""
+        return self._stream_openai_compatible("https://api.groq.com/openai/v1/chat/completions", model, prompt, api_key)
+    
+    def _stream_deepseek(self, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """Stream DeepSeek API (OpenAI compatible)"""
+        return self._stream_openai_compatible("https://api.deepseek.com/v1/chat/completions", model, prompt, api_key)
+    
+    def _stream_claude(self, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """Stream Claude API"""
+        headers = {
+            "x-api-key": api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": model,
+            "max_tokens": self.MAX_OUTPUT_TOKENS,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True
+        }
+        return self._stream_sse(
+            "https://api.anthropic.com/v1/messages", headers, data,
+            lambda event: event.get('delta', {}).get('text') if event.get('type') == 'content_block_delta' else None
+        )
+    
+    def _stream_gemini(self, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """Stream Gemini API"""
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:streamGenerateContent?alt=sse&key={api_key}"
+        headers = {"Content-Type": "application/json"}
+        data = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {"maxOutputTokens": self.MAX_OUTPUT_TOKENS}
+        }
+        return self._stream_sse(
+            url, headers, data,
+            lambda event: "".join(
+                part.get('text', '')
+                for part in (event.get('candidates') or [{}])[0].get('content', {}).get('parts', [])
+            )
+        )
+    
+    def _stream_qwen(self, model: str, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """Stream Qwen API"""
+        url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "X-DashScope-SSE": "enable"
+        }
+        data = {
+            "model": model,
+            "input": {"prompt": prompt},
+            "parameters": {"max_tokens": self.MAX_OUTPUT_TOKENS, "incremental_output": True}
+        }
+        return self._stream_sse(url, headers, data, lambda event: event.get('output', {}).get('text'))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return LLM service statistics"""
+        return {
+            "response_cache": self.response_cache.get_stats() if self.response_cache else None,
+            "single_flight": self.single_flight.get_stats(),
+            "routing": {"fallbacks": self.fallbacks, "hedges_fired": self.hedges_fired},
+            "rate_limits": self.rate_limits.get_stats(),
+            "providers": {provider: health.snapshot() for provider, health in self.health.items()}
+        }
+    
+    async def aclose(self) -> None:
+        """Release pooled upstream connections"""
+        await self.transport.aclose()
+    
+    async def validate_api_key(self, provider: str, api_key: str) -> bool:
+        """Validate API key for a provider
+
+        Returns True for an accepted key and False for a rejected one (401/403)
+        or an unsupported provider. Anything else - rate limits, server errors,
+        network failures - is not a verdict on the key and raises instead.
+        """
+        # Simple validation by making a minimal request
+        test_prompt = "Hello"
+        if provider == 'openai':
+            url = "https://api.openai.com/v1/chat/completions"
+            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+            data = {"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": test_prompt}], "max_tokens": 5}
+        elif provider == 'claude':
+            url = "https://api.anthropic.com/v1/messages"
+            headers = {"x-api-key": api_key, "anthropic-version": "2023-06-01", "Content-Type": "application/json"}
+            data = {"model": "claude-3-sonnet-20240229", "max_tokens": 5, "messages": [{"role": "user", "content": test_prompt}]}
+        elif provider == 'gemini':
+            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={api_key}"
+            headers = {"Content-Type": "application/json"}
+            data = {"contents": [{"parts": [{"text": test_prompt}]}]}
+        elif provider == 'groq':
+            url = "https://api.groq.com/openai/v1/chat/completions"
+            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+            data = {"model": "mixtral-8x7b-32768", "messages": [{"role": "user", "content": test_prompt}], "max_tokens": 5}
+        elif provider == 'deepseek':
+            url = "https://api.deepseek.com/v1/chat/completions"
+            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+            data = {"model": "deepseek-chat", "messages": [{"role": "user", "content": test_prompt}], "max_tokens": 5}
+        elif provider == 'qwen':
+            url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+            headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+            data = {"model": "qwen-turbo", "input": {"prompt": test_prompt}, "parameters": {"max_tokens": 5}}
+        else:
+            return False
+        
+        # Probes bypass the governor hook so a throttled probe does not back off production traffic
+        response = await self.transport.post(url, headers=headers, json=data, notify=False)
+        if response.status_code == 200:
+            return True
+        if response.status_code in (401, 403):
             return False
+        raise RuntimeError(f"[ERROR {response.status_code}] Key check inconclusive: {response.text[:200]}")
 
 # Global instance
 llm_service = LLMService()
\ No newline at end of file
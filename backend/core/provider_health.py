@@ -0,0 +1,67 @@
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+
+class ProviderHealth:
+    """Rolling latency and error statistics for one LLM provider"""
+
+    def __init__(self, window: int = 100):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+        self.cancelled = 0
+
+    def record(self, latency: float, ok: bool, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._samples.append((latency, ok))
+            if not ok:
+                self.last_error = (error or "")[:200]
+                self.last_error_at = time.time()
+
+    def record_cancelled(self) -> None:
+        """Count a call abandoned before it finished, e.g. a losing hedge leg"""
+        with self._lock:
+            self.cancelled += 1
+
+    def _latencies(self) -> List[float]:
+        return sorted(latency for latency, ok in self._samples if ok)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile of successful calls, in seconds"""
+        with self._lock:
+            latencies = self._latencies()
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, ok in self._samples if not ok) / len(self._samples)
+
+    def score(self, latency_scale: float = 10.0) -> float:
+        """Health in [0, 1]: success rate discounted by p95 latency; unknown providers score 1"""
+        p95 = self.percentile(0.95)
+        latency_factor = 1.0 / (1.0 + p95 / latency_scale) if p95 is not None else 1.0
+        return round((1.0 - self.error_rate()) * latency_factor, 4)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self._lock:
+            samples = len(self._samples)
+            cancelled = self.cancelled
+        return {
+            "samples": samples,
+            "cancelled": cancelled,
+            "error_rate": round(self.error_rate(), 4),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "health_score": self.score(),
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at
+        }
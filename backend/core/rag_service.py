@@ -2,167 +2,654 @@ import os
 import chromadb
 from chromadb.utils import embedding_functions
 import PyPDF2
-import openpyxl
-import pandas as pd
-from docx import Document
-from typing import List, Dict, Any
-import io
+from typing import List, Dict, Any, Optional, Iterator, Union, Callable, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import time
+import hashlib
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from core.chunking import TextChunker, content_hash
+from core.embedding_cache import CachedEmbeddingFunction
+from core.cache import LRUCache
+from core.keyword_index import KeywordIndex, reciprocal_rank_fusion
+from core.document_catalog import DocumentCatalog
+from core.metrics import ingest_stage_seconds
+from core import extraction
+
+def _preview(text: str, length: int = 200) -> str:
+    """Short content preview shown in document listings"""
+    return text[:length] + "..." if len(text) > length else text
 
 class RAGService:
     """RAG service for file processing and embeddings"""
     
-    def __init__(self, storage_path: str = "../storage/chromadb"):
+    def __init__(self, storage_path: str = "../storage/chromadb",
+                 chunk_size: int = None, chunk_overlap: int = None, batch_size: int = None):
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
         
+        # Chunking and batching configuration
+        self.chunker = TextChunker(
+            chunk_size=chunk_size or int(os.getenv('RAG_CHUNK_SIZE', 180)),
+            chunk_overlap=chunk_overlap if chunk_overlap is not None else int(os.getenv('RAG_CHUNK_OVERLAP', 30))
+        )
+        self.batch_size = batch_size or int(os.getenv('RAG_BATCH_SIZE', 128))
+        
+        # Streaming extraction configuration
+        self.max_workers = int(os.getenv('RAG_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+        self.pdf_parallel_threshold = int(os.getenv('RAG_PDF_PARALLEL_PAGES', 32))
+        self.pdf_pages_per_task = int(os.getenv('RAG_PDF_PAGES_PER_TASK', 8))
+        # Bulk files above this size are streamed instead of extracted whole in a worker
+        self.bulk_stream_bytes = int(float(os.getenv('RAG_BULK_STREAM_MB', 16)) * 1024 * 1024)
+        # Workers are spawned rather than forked from the threaded server on every platform
+        self.start_method = os.getenv('RAG_EXTRACT_START_METHOD', 'spawn')
+        self._process_pool = None
+        self._pool_lock = threading.Lock()
+        
+        # Per-document locks so concurrent ingests of one filename cannot interleave
+        self._document_locks: Dict[str, list] = {}
+        self._document_locks_guard = threading.Lock()
+        
+        # Retrieval cache, invalidated through the collection generation counter
+        self.generation = 0
+        self._generation_lock = threading.Lock()
+        self.query_cache = LRUCache(
+            max_entries=int(os.getenv('RAG_QUERY_CACHE_SIZE', 512)),
+            ttl=float(os.getenv('RAG_QUERY_CACHE_TTL', 300))
+        )
+        
         # Initialize ChromaDB
         self.client = chromadb.PersistentClient(path=storage_path)
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_function = CachedEmbeddingFunction(
+            embedding_functions.DefaultEmbeddingFunction(),
+            cache_path=os.path.join(os.path.dirname(os.path.abspath(storage_path)), "cache", "embeddings.sqlite3"),
+            max_disk_entries=int(os.getenv('RAG_EMBED_CACHE_MAX', 100000))
+        )
         
         # Get or create collection
-        try:
-            self.collection = self.client.get_collection(name="rag_documents")
-        except:
-            self.collection = self.client.create_collection(
-                name="rag_documents",
-                embedding_function=self.embedding_function
-            )
+        self.collection = self.client.get_or_create_collection(
+            name="rag_documents",
+            embedding_function=self.embedding_function
+        )
+        
+        # Keyword index for exact matches (SKUs, order numbers), maintained on every add and delete
+        self.keyword_index = KeywordIndex(
+            os.path.join(os.path.dirname(os.path.abspath(storage_path)), "rag", "keyword_index.sqlite3")
+        )
+        if self.keyword_index.count() == 0 and self.collection.count() > 0:
+            self._rebuild_keyword_index()
+        self._search_pool = ThreadPoolExecutor(max_workers=4)
+        
+        # Lightweight per-document catalog used for listings
+        self.catalog = DocumentCatalog(
+            os.path.join(os.path.dirname(os.path.abspath(storage_path)), "rag", "catalog.sqlite3")
+        )
+        if self.catalog.count() == 0 and self.collection.count() > 0:
+            self._rebuild_catalog()
     
-    def process_file(self, file_content: bytes, filename: str, file_type: str) -> Dict[str, Any]:
-        """Process uploaded file and extract text content"""
+    def process_file(self, source: Union[bytes, str], filename: str, file_type: str,
+                     progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
+        """Process an uploaded file (raw bytes or a path on disk), embedding only new or changed chunks
+
+        progress, if given, is called with pages_parsed (extracted pages, paragraph
+        groups or sheets) and chunks_embedded after each unit of work.
+        """
         try:
-            text_content = ""
-            
-            if file_type == '.pdf':
-                text_content = self._extract_pdf_text(file_content)
-            elif file_type == '.docx':
-                text_content = self._extract_docx_text(file_content)
-            elif file_type == '.xlsx':
-                text_content = self._extract_xlsx_text(file_content)
-            elif file_type in ['.txt', '.md']:
-                text_content = file_content.decode('utf-8')
-            elif file_type == '.csv':
-                text_content = self._extract_csv_text(file_content)
-            else:
+            segments = self._extract_segments(source, file_type)
+            if segments is None:
                 return {"success": False, "error": f"Unsupported file type: {file_type}"}
             
-            # Add to ChromaDB
-            document_id = f"{filename}_{len(text_content)}"
-            self.collection.add(
-                documents=[text_content],
-                metadatas=[{"filename": filename, "file_type": file_type}],
-                ids=[document_id]
-            )
-            
-            return {
-                "success": True,
+            document_id = self.document_id_for(filename)
+            with self._document_lock(document_id):
+                existing_ids = set(self.collection.get(where={"document_id": document_id}, include=[])['ids'])
+                
+                started = time.perf_counter()
+                totals = {"text_length": 0, "pages_parsed": 0, "chunks_embedded": 0, "extract_seconds": 0.0}
+                
+                def report():
+                    if progress:
+                        progress({"pages_parsed": totals["pages_parsed"], "chunks_embedded": totals["chunks_embedded"]})
+                
+                def measured(segments):
+                    # Extraction is lazy, so only time spent producing each segment counts toward it
+                    segments = iter(segments)
+                    while True:
+                        extract_started = time.perf_counter()
+                        segment = next(segments, None)
+                        totals["extract_seconds"] += time.perf_counter() - extract_started
+                        if segment is None:
+                            return
+                        totals["text_length"] += len(segment["text"])
+                        totals["pages_parsed"] += 1
+                        report()
+                        yield segment
+                
+                seen_ids = set()
+                to_add, to_update = [], []
+                chunks_added = chunks_skipped = 0
+                preview = ""
+                for action, chunk in self._plan_chunks(measured(segments), document_id, filename, file_type,
+                                                       existing_ids, seen_ids):
+                    if action != "skip" and chunk["chunk_index"] == 0:
+                        preview = _preview(chunk["text"])
+                    if action == "skip":
+                        chunks_skipped += 1
+                    elif action == "update":
+                        # Unchanged content: refresh its location metadata without re-embedding
+                        chunks_skipped += 1
+                        to_update.append(chunk)
+                        if len(to_update) >= self.batch_size:
+                            self._write_chunks(to_update, embed=False)
+                            to_update = []
+                    else:
+                        to_add.append(chunk)
+                        if len(to_add) >= self.batch_size:
+                            chunks_added += self._write_chunks(to_add)
+                            totals["chunks_embedded"] = chunks_added
+                            report()
+                            to_add = []
+                if to_add:
+                    chunks_added += self._write_chunks(to_add)
+                    totals["chunks_embedded"] = chunks_added
+                    report()
+                if to_update:
+                    self._write_chunks(to_update, embed=False)
+                
+                # Chunks from the previous version that no longer exist
+                vanished = self._delete_chunks(list(existing_ids - seen_ids))
+                elapsed = time.perf_counter() - started
+                ingest_stage_seconds.observe(totals["extract_seconds"], stage="extract")
+                
+                self.catalog.upsert(document_id, filename, file_type,
+                                    os.path.getsize(source) if isinstance(source, str) else len(source),
+                                    len(seen_ids), preview)
+                
+                return {
+                    "success": True,
+                    "document_id": document_id,
+                    "file_type": file_type,
+                    "text_length": totals["text_length"],
+                    "chunks_created": chunks_added,
+                    "chunks_added": chunks_added,
+                    "chunks_skipped": chunks_skipped,
+                    "chunks_removed": vanished,
+                    "ingest_seconds": round(elapsed, 3),
+                    "chunks_per_second": round(chunks_added / elapsed, 1) if elapsed > 0 else None,
+                    "message": f"File {filename} processed and embedded successfully"
+                }
+                
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def _acquire_document(self, document_id: str, blocking: bool = True) -> bool:
+        """Take a document's ingestion lock, held from reading its existing chunks until stale ones are deleted"""
+        with self._document_locks_guard:
+            entry = self._document_locks.setdefault(document_id, [threading.Lock(), 0])
+            entry[1] += 1
+        if entry[0].acquire(blocking):
+            return True
+        self._forget_document_lock(document_id, entry)
+        return False
+    
+    def _release_document(self, document_id: str) -> None:
+        with self._document_locks_guard:
+            entry = self._document_locks[document_id]
+        entry[0].release()
+        self._forget_document_lock(document_id, entry)
+    
+    def _forget_document_lock(self, document_id: str, entry: list) -> None:
+        with self._document_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._document_locks[document_id]
+    
+    @contextmanager
+    def _document_lock(self, document_id: str):
+        self._acquire_document(document_id)
+        try:
+            yield
+        finally:
+            self._release_document(document_id)
+    
+    @staticmethod
+    def document_id_for(filename: str) -> str:
+        """Stable document id for an uploaded filename"""
+        return "doc_" + hashlib.sha1(filename.encode('utf-8')).hexdigest()[:16]
+    
+    def _plan_chunks(self, segments: Iterator[Dict[str, Any]], document_id: str, filename: str, file_type: str,
+                     existing_ids: set, seen_ids: set) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Chunk segments and classify each chunk as "add" (new content), "update" or "skip" (duplicate)"""
+        chunk_index = 0
+        for chunk in self.chunker.split_segments(segments):
+            chunk_id = f"{document_id}:{content_hash(chunk['text'])}"
+            if chunk_id in seen_ids:
+                # Identical chunk repeated within the same file
+                yield "skip", chunk
+                continue
+            seen_ids.add(chunk_id)
+            chunk.update({
+                "id": chunk_id,
+                "chunk_index": chunk_index,
                 "document_id": document_id,
-                "text_length": len(text_content),
-                "message": f"File {filename} processed and embedded successfully"
+                "filename": filename,
+                "file_type": file_type
+            })
+            chunk_index += 1
+            yield ("update" if chunk_id in existing_ids else "add"), chunk
+    
+    def _write_chunks(self, chunks: List[Dict[str, Any]], embed: bool = True) -> int:
+        """Store one batch of chunks; embed=False only rewrites metadata of existing chunks"""
+        ids, documents, metadatas = [], [], []
+        for chunk in chunks:
+            ids.append(chunk["id"])
+            documents.append(chunk["text"])
+            metadata = {
+                "document_id": chunk["document_id"],
+                "filename": chunk["filename"],
+                "file_type": chunk["file_type"],
+                "chunk_index": chunk["chunk_index"]
             }
+            for key in ("offset", "page", "paragraph", "sheet", "row_start", "row_end"):
+                if key in chunk:
+                    metadata[key] = chunk[key]
+            metadatas.append(metadata)
+        
+        if embed:
+            # Embed explicitly so embedding and storage time are measured separately
+            with ingest_stage_seconds.time(stage="embed"):
+                embeddings = self.embedding_function(documents)
+            with ingest_stage_seconds.time(stage="write"):
+                self.collection.add(documents=documents, embeddings=embeddings, metadatas=metadatas, ids=ids)
+                self.keyword_index.add([(chunk["id"], chunk["document_id"], chunk["text"]) for chunk in chunks])
+        else:
+            with ingest_stage_seconds.time(stage="write"):
+                self.collection.update(ids=ids, metadatas=metadatas)
+        self._bump_generation()
+        return len(ids)
+    
+    def _delete_chunks(self, chunk_ids: List[str]) -> int:
+        """Delete chunks from the collection and keyword index in batches"""
+        for i in range(0, len(chunk_ids), self.batch_size):
+            self.collection.delete(ids=chunk_ids[i:i + self.batch_size])
+        self.keyword_index.delete(chunk_ids)
+        if chunk_ids:
+            self._bump_generation()
+        return len(chunk_ids)
+    
+    def _bump_generation(self) -> None:
+        """Mark the collection as mutated, invalidating cached retrieval results"""
+        with self._generation_lock:
+            self.generation += 1
+        self.query_cache.clear()
+    
+    def _extract_segments(self, source: Union[bytes, str], file_type: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """Stream text as location-tagged segments, parallelizing large PDFs"""
+        if file_type == '.pdf':
+            return self._iter_pdf_pages(source)
+        return extraction.iter_segments(source, file_type, self.chunker.chunk_size)
+    
+    def _iter_pdf_pages(self, source: Union[bytes, str]) -> Iterator[Dict[str, Any]]:
+        """Yield PDF text one page at a time, fanning large files out across processes"""
+        if not isinstance(source, str):
+            yield from extraction.iter_pdf_pages(source)
+            return
+        
+        page_count = len(PyPDF2.PdfReader(source).pages)
+        if page_count < self.pdf_parallel_threshold:
+            yield from extraction.iter_pdf_pages(source)
+            return
+        
+        # Workers reopen the file by path; only a bounded window of page ranges is in flight
+        ranges = [(start, min(start + self.pdf_pages_per_task, page_count))
+                  for start in range(0, page_count, self.pdf_pages_per_task)]
+        pool = self._get_process_pool()
+        window = self.max_workers * 2
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(extraction.extract_pdf_page_range, source, start, end))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Lazily create the process pool used for parallel extraction
+
+        Workers only need core.extraction, but spawned processes also re-import
+        the launching script, so the app must be started through uvicorn
+        (uvicorn main:app) rather than as python main.py.
+        """
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return self._process_pool
+    
+    def process_files(self, files: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Ingest many (path, filename) files at once
+
+        Files are extracted in parallel across the process pool, their chunks are
+        coalesced into large collection.add batches, and a failure in one file
+        does not abort the others. A file's stale chunks, metadata updates and
+        catalog entry are only applied once its new chunks are stored. Filenames
+        identify documents, so repeats within a batch are rejected.
+
+        A worker returns a file's segments all at once, so files larger than
+        bulk_stream_bytes go through the streaming process_file path instead,
+        after the pooled files, keeping memory bounded.
+        """
+        started = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        rejected: List[Dict[str, Any]] = []
+        pending_chunks: List[Dict[str, Any]] = []
+        pending_files: set = set()
+        flush_size = self.batch_size * 4
+        # Per-file work held back until the file's new chunks are written
+        deferred: Dict[str, Tuple[List[Dict[str, Any]], List[str], Tuple]] = {}
+        
+        def finish(filename):
+            to_update, stale_ids, catalog_entry = deferred.pop(filename)
+            try:
+                for i in range(0, len(to_update), self.batch_size):
+                    self._write_chunks(to_update[i:i + self.batch_size], embed=False)
+                results[filename]["chunks_removed"] = self._delete_chunks(stale_ids)
+                self.catalog.upsert(*catalog_entry)
+            except Exception as e:
+                results[filename].update(success=False, error=str(e))
+            finally:
+                self._release_document(catalog_entry[0])
+        
+        def flush():
+            nonlocal pending_chunks
+            if not pending_chunks:
+                return
+            # Embedding and collection.add calls stay batch_size-sized however large a file is
+            for i in range(0, len(pending_chunks), self.batch_size):
+                try:
+                    self._write_chunks(pending_chunks[i:i + self.batch_size])
+                except Exception as e:
+                    failed = {chunk["filename"] for chunk in pending_chunks[i:]}
+                    # Roll back the new chunks these files already wrote; their previous version is untouched
+                    try:
+                        self._delete_chunks([chunk["id"] for chunk in pending_chunks[:i]
+                                             if chunk["filename"] in failed])
+                    except Exception:
+                        pass
+                    for filename in failed:
+                        results[filename].update(success=False, error=f"Embedding failed: {e}")
+                        self._release_document(deferred.pop(filename)[2][0])
+                    pending_files.difference_update(failed)
+                    break
+            for filename in pending_files:
+                finish(filename)
+            pending_chunks = []
+            pending_files.clear()
+        
+        pool = self._get_process_pool()
+        futures = {}
+        streamed = []
+        for path, filename in files:
+            file_type = os.path.splitext(filename)[1].lower()
+            if filename in results:
+                rejected.append({"filename": filename, "success": False, "error": "Duplicate filename in batch"})
+                continue
+            if file_type not in extraction.SUPPORTED_FILE_TYPES:
+                results[filename] = {"filename": filename, "success": False, "error": f"Unsupported file type: {file_type}"}
+                continue
+            results[filename] = {"filename": filename, "file_type": file_type, "success": True}
+            if os.path.getsize(path) > self.bulk_stream_bytes:
+                streamed.append((path, filename, file_type))
+                continue
+            futures[pool.submit(extraction.extract_file, path, file_type, self.chunker.chunk_size)] = (
+                path, filename, file_type)
+        
+        for future in as_completed(futures):
+            path, filename, file_type = futures[future]
+            result = results[filename]
+            locked = False
+            try:
+                segments, extract_seconds = future.result()
+                ingest_stage_seconds.observe(extract_seconds, stage="extract")
+                document_id = self.document_id_for(filename)
+                if not self._acquire_document(document_id, blocking=False):
+                    # Release the locks held for pending files before waiting, so batches cannot deadlock
+                    flush()
+                    self._acquire_document(document_id)
+                locked = True
+                existing_ids = set(self.collection.get(where={"document_id": document_id}, include=[])['ids'])
+                seen_ids = set()
+                to_add, to_update = [], []
+                skipped = 0
+                preview = ""
+                for action, chunk in self._plan_chunks(iter(segments), document_id, filename, file_type,
+                                                       existing_ids, seen_ids):
+                    if action != "skip" and chunk["chunk_index"] == 0:
+                        preview = _preview(chunk["text"])
+                    if action == "add":
+                        to_add.append(chunk)
+                    else:
+                        skipped += 1
+                        if action == "update":
+                            to_update.append(chunk)
+                catalog_entry = (document_id, filename, file_type, os.path.getsize(path), len(seen_ids), preview)
+            except Exception as e:
+                result.update(success=False, error=str(e))
+                if locked:
+                    self._release_document(document_id)
+            else:
+                added = len(to_add)
+                pending_chunks.extend(to_add)
+                result.update(document_id=document_id, chunks_added=added, chunks_skipped=skipped, chunks_removed=0)
+                deferred[filename] = (to_update, list(existing_ids - seen_ids), catalog_entry)
+                if added:
+                    pending_files.add(filename)
+                else:
+                    finish(filename)
             
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+            if len(pending_chunks) >= flush_size:
+                flush()
+        flush()
+        
+        # No document locks are held here, so process_file can take its own
+        for path, filename, file_type in streamed:
+            outcome = self.process_file(path, filename, file_type)
+            if outcome["success"]:
+                results[filename].update({key: outcome[key] for key in
+                                          ("document_id", "chunks_added", "chunks_skipped", "chunks_removed")})
+            else:
+                results[filename].update(success=False, error=outcome["error"])
+        
+        elapsed = time.perf_counter() - started
+        succeeded = [r for r in results.values() if r["success"]]
+        chunks_added = sum(r.get("chunks_added", 0) for r in succeeded)
+        return {
+            "files_total": len(files),
+            "files_succeeded": len(succeeded),
+            "files_failed": len(results) + len(rejected) - len(succeeded),
+            "chunks_added": chunks_added,
+            "chunks_skipped": sum(r.get("chunks_skipped", 0) for r in succeeded),
+            "chunks_removed": sum(r.get("chunks_removed", 0) for r in succeeded),
+            "elapsed_seconds": round(elapsed, 3),
+            "files_per_second": round(len(files) / elapsed, 2) if elapsed > 0 else None,
+            "chunks_per_second": round(chunks_added / elapsed, 1) if elapsed > 0 else None,
+            "files": list(results.values()) + rejected
+        }
     
-    def _extract_pdf_text(self, file_content: bytes) -> str:
-        """Extract text from PDF file"""
-        pdf_file = io.BytesIO(file_content)
-        reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
-    
-    def _extract_docx_text(self, file_content: bytes) -> str:
-        """Extract text from DOCX file"""
-        docx_file = io.BytesIO(file_content)
-        doc = Document(docx_file)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    
-    def _extract_xlsx_text(self, file_content: bytes) -> str:
-        """Extract text from XLSX file"""
-        xlsx_file = io.BytesIO(file_content)
-        wb = openpyxl.load_workbook(xlsx_file)
-        text = ""
-        for sheet_name in wb.sheetnames:
-            sheet = wb[sheet_name]
-            text += f"Sheet: {sheet_name}\n"
-            for row in sheet.iter_rows(values_only=True):
-                row_text = "\t".join([str(cell) if cell is not None else "" for cell in row])
-                text += row_text + "\n"
-        return text
-    
-    def _extract_csv_text(self, file_content: bytes) -> str:
-        """Extract text from CSV file"""
-        csv_file = io.StringIO(file_content.decode('utf-8'))
-        df = pd.read_csv(csv_file)
-        return df.to_string()
-    
-    def query_documents(self, query: str, n_results: int = 5) -> str:
-        """Query documents for relevant context"""
+    def query_documents(self, query: str, n_results: int = 5, mode: str = "hybrid") -> str:
+        """Query document chunks for relevant context"""
+        chunks = self.search_chunks(query, n_results, mode)
+        # Combine relevant chunks
+        return "\n\n".join(chunk["text"] for chunk in chunks)
+    
+    def search_chunks(self, query: str, n_results: int = 5, mode: str = "hybrid") -> List[Dict[str, Any]]:
+        """Retrieve ranked chunks using vector, keyword (BM25) or hybrid search, served from cache when unchanged"""
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            if mode not in ("hybrid", "vector", "keyword"):
+                raise ValueError(f"Unsupported search mode: {mode}")
+            
+            cache_key = (self.generation, " ".join(query.lower().split()), n_results, mode)
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            if results['documents'] and results['documents'][0]:
-                # Combine relevant documents
-                context = "\n\n".join(results['documents'][0])
-                return context
+            if mode == "vector":
+                chunks = self._vector_search(query, n_results)
+            elif mode == "keyword":
+                chunks = self._keyword_search(query, n_results)
             else:
-                return ""
+                # Run both retrievers concurrently over a wider candidate pool, then fuse ranks
+                candidates = n_results * 4
+                vector_future = self._search_pool.submit(self._vector_search, query, candidates)
+                keyword_future = self._search_pool.submit(self._keyword_search, query, candidates, False)
+                chunks = reciprocal_rank_fusion([vector_future.result(), keyword_future.result()], n_results)
+                self._fill_texts(chunks)
+            
+            # Only cache if no mutation happened while the query ran
+            if cache_key[0] == self.generation:
+                self.query_cache.set(cache_key, chunks)
+            return chunks
                 
         except Exception as e:
             print(f"Error querying documents: {e}")
-            return ""
+            return []
     
-    def list_documents(self) -> List[Dict[str, Any]]:
-        """List all uploaded documents"""
-        try:
-            results = self.collection.get()
-            documents = []
-            
-            for i, doc_id in enumerate(results['ids']):
-                metadata = results['metadatas'][i] if results['metadatas'] else {}
-                documents.append({
-                    "id": doc_id,
+    def _vector_search(self, query: str, n_results: int) -> List[Dict[str, Any]]:
+        """Dense retrieval through the Chroma collection"""
+        if self.collection.count() == 0:
+            return []
+        results = self.collection.query(
+            query_texts=[query],
+            n_results=n_results,
+            include=["documents", "metadatas", "distances"]
+        )
+        if not results['ids'] or not results['ids'][0]:
+            return []
+        return [
+            {
+                "id": chunk_id,
+                "text": results['documents'][0][i],
+                "metadata": results['metadatas'][0][i],
+                "score": -results['distances'][0][i]
+            }
+            for i, chunk_id in enumerate(results['ids'][0])
+        ]
+    
+    def _keyword_search(self, query: str, n_results: int, with_texts: bool = True) -> List[Dict[str, Any]]:
+        """Sparse BM25 retrieval through the local inverted index"""
+        chunks = [
+            {"id": chunk_id, "text": None, "metadata": None, "score": score}
+            for chunk_id, score in self.keyword_index.search(query, n_results)
+        ]
+        if with_texts:
+            self._fill_texts(chunks)
+        return chunks
+    
+    def _fill_texts(self, chunks: List[Dict[str, Any]]) -> None:
+        """Load text and metadata for chunks that only carry an id"""
+        missing = [chunk["id"] for chunk in chunks if chunk["text"] is None]
+        if not missing:
+            return
+        results = self.collection.get(ids=missing, include=["documents", "metadatas"])
+        found = {
+            chunk_id: (results['documents'][i], results['metadatas'][i])
+            for i, chunk_id in enumerate(results['ids'])
+        }
+        for chunk in chunks:
+            if chunk["text"] is None and chunk["id"] in found:
+                chunk["text"], chunk["metadata"] = found[chunk["id"]]
+        # Drop index entries whose chunk no longer exists in the collection
+        chunks[:] = [chunk for chunk in chunks if chunk["text"] is not None]
+    
+    def _rebuild_keyword_index(self) -> None:
+        """Index chunks already stored in Chroma, e.g. after upgrading an existing install"""
+        offset = 0
+        while True:
+            results = self.collection.get(limit=self.batch_size * 8, offset=offset, include=["documents", "metadatas"])
+            if not results['ids']:
+                break
+            self.keyword_index.add([
+                (chunk_id, (results['metadatas'][i] or {}).get('document_id', chunk_id), results['documents'][i])
+                for i, chunk_id in enumerate(results['ids'])
+            ])
+            offset += len(results['ids'])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return RAG cache statistics"""
+        return {
+            "generation": self.generation,
+            "embedding_cache": self.embedding_function.get_stats(),
+            "query_cache": self.query_cache.get_stats(),
+            "keyword_index": self.keyword_index.get_stats()
+        }
+    
+    def list_documents(self, limit: int = 50, cursor: Optional[str] = None, sort: str = 'ingested_at',
+                       order: str = 'desc', filename: Optional[str] = None,
+                       include_total: Optional[bool] = None) -> Dict[str, Any]:
+        """List uploaded documents from the catalog, one page at a time"""
+        return self.catalog.list(limit=limit, cursor=cursor, sort=sort, order=order, filename=filename,
+                                 include_total=include_total)
+    
+    def _rebuild_catalog(self) -> None:
+        """Catalog documents already stored in Chroma, e.g. after upgrading an existing install"""
+        documents: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        while True:
+            results = self.collection.get(limit=self.batch_size * 8, offset=offset, include=["documents", "metadatas"])
+            if not results['ids']:
+                break
+            for i, chunk_id in enumerate(results['ids']):
+                metadata = results['metadatas'][i] or {}
+                document_id = metadata.get('document_id', chunk_id)
+                entry = documents.setdefault(document_id, {
                     "filename": metadata.get('filename', 'Unknown'),
                     "file_type": metadata.get('file_type', 'Unknown'),
-                    "content_preview": results['documents'][i][:200] + "..." if len(results['documents'][i]) > 200 else results['documents'][i]
+                    "chunk_count": 0,
+                    "preview": ""
                 })
-            
-            return documents
-            
-        except Exception as e:
-            print(f"Error listing documents: {e}")
-            return []
+                entry["chunk_count"] += 1
+                if metadata.get('chunk_index', 0) == 0:
+                    entry["preview"] = _preview(results['documents'][i])
+            offset += len(results['ids'])
+        
+        for document_id, entry in documents.items():
+            self.catalog.upsert(document_id, entry["filename"], entry["file_type"], 0,
+                                entry["chunk_count"], entry["preview"])
     
-    def delete_document(self, document_id: str) -> bool:
-        """Delete a document from the collection"""
+    def delete_document(self, document_id: str) -> Dict[str, Any]:
+        """Delete all chunks of a document from the collection"""
         try:
-            self.collection.delete(ids=[document_id])
-            return True
+            with self._document_lock(document_id):
+                existing = self.collection.get(where={"document_id": document_id}, include=[])
+                if not existing['ids']:
+                    return {"success": False, "error": f"Document not found: {document_id}"}
+                self.collection.delete(ids=existing['ids'])
+                self.keyword_index.delete(existing['ids'])
+                self.catalog.delete(document_id)
+                self._bump_generation()
+            return {"success": True, "chunks_deleted": len(existing['ids'])}
         except Exception as e:
             print(f"Error deleting document: {e}")
-            return False
+            return {"success": False, "error": str(e)}
     
-    def clear_all_documents(self) -> bool:
+    def clear_all_documents(self) -> Dict[str, Any]:
         """Clear all documents from the collection"""
         try:
             # Delete the collection and recreate it
             self.client.delete_collection(name="rag_documents")
+            self.keyword_index.clear()
+            self.catalog.clear()
             self.collection = self.client.create_collection(
                 name="rag_documents",
                 embedding_function=self.embedding_function
             )
-            return True
+            self._bump_generation()
+            return {"success": True}
         except Exception as e:
             print(f"Error clearing documents: {e}")
-            return False
+            return {"success": False, "error": str(e)}
 
 # Global instance
 rag_service = RAGService()
\ No newline at end of file
@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a provider's wait queue is at capacity"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take amount from the bucket and return how long to wait before using it
+
+        The balance may go negative, so concurrent callers queue up behind each
+        other instead of all retrying at the same moment.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def refund(self, amount: float = 1.0) -> None:
+        """Return a reservation that was never used"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+
+class ProviderGovernor:
+    """Request/token rate limits plus an AIMD concurrency limit for one provider
+
+    Callers beyond the current concurrency limit wait in a bounded FIFO queue.
+    429/503 responses halve the limit and honor Retry-After; successes grow it
+    back additively.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = 60, tokens_per_minute: float = 90000,
+                 max_concurrency: int = 8, min_concurrency: int = 1, max_queue: int = 100):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_queue = max_queue
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+        self.throttled = 0
+        self.rejected = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue_depth = 0
+
+    # Slot management -----------------------------------------------------
+
+    def _has_free_slot(self) -> bool:
+        return not self._waiters and self.in_flight < max(self.min_concurrency, int(self.limit))
+
+    def _check_capacity(self) -> None:
+        """Reject when the wait queue is full; caller holds the lock"""
+        if not self._has_free_slot() and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"Request queue for {self.name} is full ({self.max_queue} waiting)")
+
+    def _enqueue_or_grant(self, waiter) -> bool:
+        """Grant a slot immediately or queue the waiter; caller holds the lock"""
+        if self._has_free_slot():
+            self.in_flight += 1
+            return True
+        self._check_capacity()
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        return False
+
+    def _wake(self) -> None:
+        """Hand free slots to queued waiters in FIFO order; caller holds the lock"""
+        while self._waiters and self.in_flight < max(self.min_concurrency, int(self.limit)):
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self._resolve, future)
+
+    def _resolve(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            # The waiter gave up after being granted a slot
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def _rate_delay(self, estimated_tokens: int) -> float:
+        return max(
+            self.blocked_until - time.monotonic(),
+            self.requests.reserve(1),
+            self.tokens.reserve(estimated_tokens),
+            0.0
+        )
+
+    def _record_wait(self, started: float) -> None:
+        waited = time.monotonic() - started
+        with self._lock:
+            self.waits += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """Async context manager holding a concurrency slot within the rate limits
+
+        Rate tokens are reserved first, so a request waiting out a rate limit
+        never holds a concurrency slot idle.
+        """
+        started = time.monotonic()
+        # Rejected requests must not spend rate budget
+        with self._lock:
+            self._check_capacity()
+        delay = self._rate_delay(estimated_tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            with self._lock:
+                granted = self._enqueue_or_grant((loop, future))
+        except QueueFullError:
+            # The queue filled up while this request waited out the rate limit
+            self.requests.refund(1)
+            self.tokens.refund(estimated_tokens)
+            raise
+        if not granted:
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Cancelled after _wake granted the slot: hand it back
+                    self.release()
+                else:
+                    with self._lock:
+                        try:
+                            self._waiters.remove((loop, future))
+                        except ValueError:
+                            pass
+                raise
+        try:
+            self._record_wait(started)
+            yield
+        finally:
+            self.release()
+
+    # Feedback ------------------------------------------------------------
+
+    def record(self, status_code: Optional[int], retry_after: Optional[str] = None) -> None:
+        """Adapt the concurrency limit to an upstream response"""
+        with self._lock:
+            if status_code in (429, 503):
+                self.throttled += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                delay = _parse_retry_after(retry_after)
+                if delay:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            elif status_code is not None and status_code < 400:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(self.limit, 1.0))
+                self._wake()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": self.max_queue_depth,
+                "throttled_responses": self.throttled,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / self.waits * 1000, 1) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 1)
+            }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds; HTTP-date values fall back to a short pause"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return 5.0
+
+
+class GovernorRegistry:
+    """Per-provider governors configured from LLM_RPM_<P>, LLM_TPM_<P> and LLM_CONCURRENCY_<P>"""
+
+    def __init__(self):
+        self._governors: Dict[str, ProviderGovernor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> ProviderGovernor:
+        with self._lock:
+            governor = self._governors.get(provider)
+            if governor is None:
+                suffix = provider.upper()
+                governor = self._governors[provider] = ProviderGovernor(
+                    provider,
+                    requests_per_minute=float(os.getenv(f'LLM_RPM_{suffix}', 60)),
+                    tokens_per_minute=float(os.getenv(f'LLM_TPM_{suffix}', 90000)),
+                    max_concurrency=int(os.getenv(f'LLM_CONCURRENCY_{suffix}', 8)),
+                    max_queue=int(os.getenv('LLM_MAX_QUEUE', 100))
+                )
+            return governor
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            governors = dict(self._governors)
+        return {provider: governor.get_stats() for provider, governor in governors.items()}
+
+
+# Global instance
+governors = GovernorRegistry()
@@ -0,0 +1,216 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+
+class ResponseCache:
+    """Persistent LLM response cache with an exact tier and an optional semantic tier
+
+    The exact tier is keyed by provider, model and a hash of the prompt plus RAG
+    context. The semantic tier, enabled by passing an embedding function,
+    reuses a cached answer for the same provider, model and RAG context when
+    the prompt's embedding is within similarity_threshold (cosine) of a cached
+    prompt. Only the prompt is embedded: the embedding model truncates long
+    input, so a large context would otherwise drown out the question.
+    """
+
+    def __init__(self, cache_path: str = "../storage/cache/responses.sqlite3", ttl: float = 86400,
+                 max_entries: int = 5000, embedding_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 similarity_threshold: float = 0.95):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embedding_function = embedding_function
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, provider TEXT NOT NULL, model TEXT NOT NULL, response TEXT NOT NULL, "
+            "embedding BLOB, created_at REAL NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL, "
+            "context_hash TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "context_hash" not in columns:
+            # Older embeddings covered prompt + context and cannot be compared with prompt-only ones
+            self._conn.execute("ALTER TABLE responses ADD COLUMN context_hash TEXT")
+            self._conn.execute("UPDATE responses SET embedding = NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_model ON responses(provider, model)")
+        self._conn.commit()
+
+        # Normalized prompt embeddings per (provider, model), loaded lazily and kept in step with writes:
+        # {"keys": [...], "contexts": [...], "matrix": ndarray or None}
+        self._vectors: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, context: str = '') -> str:
+        digest = hashlib.sha256(f"{prompt}\0{context}".encode('utf-8')).hexdigest()
+        return f"{provider}:{model}:{digest}"
+
+    @staticmethod
+    def context_hash(context: str) -> str:
+        return hashlib.sha256(context.encode('utf-8')).hexdigest()
+
+    def get(self, provider: str, model: str, prompt: str, context: str = '') -> Optional[Dict[str, Any]]:
+        """Return {"response", "match"} for a cached answer, or None"""
+        key = self.make_key(provider, model, prompt, context)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                self._touch(key, now)
+                self.exact_hits += 1
+                return {"response": row[0], "match": "exact", "similarity": 1.0}
+
+        if self.embedding_function is not None:
+            vector = self._embed(prompt)
+            match = self._nearest(provider, model, vector, self.context_hash(context))
+            if match:
+                match_key, similarity = match
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT response FROM responses WHERE key = ? AND expires_at > ?", (match_key, now)
+                    ).fetchone()
+                    if row:
+                        self._touch(match_key, now)
+                        self.semantic_hits += 1
+                        return {"response": row[0], "match": "semantic", "similarity": round(similarity, 4)}
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, provider: str, model: str, prompt: str, response: str, context: str = '',
+            ttl: Optional[float] = None) -> None:
+        """Store a response and evict least recently used entries beyond max_entries"""
+        key = self.make_key(provider, model, prompt, context)
+        context_hash = self.context_hash(context)
+        vector = self._embed(prompt) if self.embedding_function is not None else None
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, provider, model, response, embedding, created_at, expires_at, last_used, context_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, vector.tobytes() if vector is not None else None,
+                 now, now + (ttl or self.ttl), now, context_hash)
+            )
+            evicted = [row[0] for row in self._conn.execute(
+                "SELECT key FROM responses WHERE expires_at <= ?", (now,)
+            ).fetchall()]
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - len(evicted)
+            if count > self.max_entries:
+                evicted += [row[0] for row in self._conn.execute(
+                    "SELECT key FROM responses WHERE expires_at > ? ORDER BY last_used LIMIT ?",
+                    (now, count - self.max_entries)
+                ).fetchall()]
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", [(evicted_key,) for evicted_key in evicted])
+            self._conn.commit()
+            self.stores += 1
+            self._drop_vectors(evicted)
+            if vector is not None:
+                self._append_vector(provider, model, key, context_hash, vector)
+
+    def _append_vector(self, provider: str, model: str, key: str, context_hash: str, vector: np.ndarray) -> None:
+        """Add or replace one row of a loaded embedding matrix; unloaded ones are read on first lookup"""
+        cached = self._vectors.get((provider, model))
+        if cached is None:
+            return
+        if key in cached["keys"]:
+            self._drop_vectors([key])
+        if cached["matrix"] is not None and cached["matrix"].shape[1] != vector.shape[0]:
+            # The embedding model changed; reload lazily
+            del self._vectors[(provider, model)]
+            return
+        cached["keys"].append(key)
+        cached["contexts"].append(context_hash)
+        row = vector.reshape(1, -1)
+        cached["matrix"] = row if cached["matrix"] is None else np.vstack([cached["matrix"], row])
+
+    def _drop_vectors(self, keys: List[str]) -> None:
+        """Remove deleted entries from the loaded embedding matrices"""
+        if not keys:
+            return
+        removed = set(keys)
+        for cached in self._vectors.values():
+            keep = [index for index, key in enumerate(cached["keys"]) if key not in removed]
+            if len(keep) == len(cached["keys"]):
+                continue
+            cached["keys"] = [cached["keys"][index] for index in keep]
+            cached["contexts"] = [cached["contexts"][index] for index in keep]
+            cached["matrix"] = cached["matrix"][keep] if keep else None
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def _touch(self, key: str, now: float) -> None:
+        self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embedding_function([text])[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _nearest(self, provider: str, model: str, vector: np.ndarray,
+                 context_hash: str) -> Optional[Tuple[str, float]]:
+        """Find the most similar cached prompt with the same context for the provider and model"""
+        with self._lock:
+            cached = self._vectors.get((provider, model))
+            if cached is None:
+                rows = self._conn.execute(
+                    "SELECT key, context_hash, embedding FROM responses WHERE provider = ? AND model = ? "
+                    "AND embedding IS NOT NULL AND expires_at > ?", (provider, model, time.time())
+                ).fetchall()
+                cached = self._vectors[(provider, model)] = {
+                    "keys": [row[0] for row in rows],
+                    "contexts": [row[1] for row in rows],
+                    "matrix": np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else None
+                }
+            # set() appends to these lists in place, so take a consistent snapshot
+            keys, matrix = list(cached["keys"]), cached["matrix"]
+            candidates = np.flatnonzero(np.asarray(cached["contexts"], dtype=object) == context_hash)
+        if matrix is None or matrix.shape[1] != vector.shape[0]:
+            return None
+        if not len(candidates):
+            return None
+        similarities = matrix[candidates] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return keys[candidates[best]], float(similarities[best])
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss statistics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            exact_hits, semantic_hits, misses = self.exact_hits, self.semantic_hits, self.misses
+            bypassed, stores = self.bypassed, self.stores
+        lookups = exact_hits + semantic_hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "exact_hits": exact_hits,
+            "semantic_hits": semantic_hits,
+            "misses": misses,
+            "bypassed": bypassed,
+            "stores": stores,
+            "hit_rate": round((exact_hits + semantic_hits) / lookups, 4) if lookups else 0.0,
+            "semantic_enabled": self.embedding_function is not None,
+            "similarity_threshold": self.similarity_threshold
+        }
@@ -1,11 +1,29 @@
 import os
 import requests
 import json
-from typing import Dict, Any, List, Optional
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional, Iterator, Iterable, Callable, Tuple
 from dotenv import load_dotenv
+from core.integration_cache import IntegrationCache
 
 load_dotenv()
 
+WOOCOMMERCE_ACTIONS = ('customers', 'orders', 'products', 'reports')
+MERCHANTGUY_ACTIONS = ('transactions', 'reports', 'analytics')
+PLATFORM_ACTIONS = {
+    'woocommerce': WOOCOMMERCE_ACTIONS,
+    'merchantguy': MERCHANTGUY_ACTIONS
+}
+
+# List endpoints that can be fetched across all pages (all_pages=True) or streamed page by page
+PAGINATED_ACTIONS = {
+    'woocommerce': ('customers', 'orders', 'products'),
+    'merchantguy': ('transactions',)
+}
+
 class APIIntegrationService:
     """Centralized API integration service for external platforms"""
     
@@ -17,9 +35,40 @@ class APIIntegrationService:
         self.merchantguy_api_key = os.getenv('MERCHANTGUY_API_KEY')
         self.merchantguy_gateway_url = os.getenv('MERCHANTGUY_GATEWAY_URL')
         
+        # Pooled keep-alive session and a shared, capped pool for concurrent page fetches
+        self.fetch_concurrency = int(os.getenv('INTEGRATION_FETCH_CONCURRENCY', 8))
+        self.page_size = int(os.getenv('INTEGRATION_PAGE_SIZE', 100))
+        self.max_pages = int(os.getenv('INTEGRATION_MAX_PAGES', 1000))
+        self.timeout = float(os.getenv('INTEGRATION_TIMEOUT', 30))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.fetch_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_concurrency, thread_name_prefix="integration")
+        
+        # Persistent read-through cache for WooCommerce and MerchantGuy reads
+        self.cache = IntegrationCache(
+            default_ttl=float(os.getenv('INTEGRATION_CACHE_TTL', 300)),
+            swr_seconds=float(os.getenv('INTEGRATION_CACHE_SWR', 600)),
+            max_bytes=int(float(os.getenv('INTEGRATION_CACHE_MAX_MB', 256)) * 1024 * 1024),
+            max_stale_seconds=float(os.getenv('INTEGRATION_CACHE_MAX_STALE', 86400)),
+            fetch_timeout=float(os.getenv('INTEGRATION_CACHE_FETCH_TIMEOUT', 10))
+        )
+        
         # Load additional API keys from config if available
         self.config_path = '../config/config.json'
         self.api_keys = self._load_config()
+        
+        self.platforms = {
+            'woocommerce': self.get_woocommerce_data,
+            'merchantguy': self.get_merchantguy_data,
+            'google_analytics': self.get_google_analytics_data,
+            'google_ads': self.get_google_ads_data,
+            'facebook': self.get_facebook_data,
+            'tiktok': self.get_tiktok_data,
+            'twitter': self.get_twitter_data,
+            'youtube': self.get_youtube_data
+        }
     
     def _load_config(self) -> Dict[str, str]:
         """Load API keys from config file"""
@@ -68,62 +117,224 @@ class APIIntegrationService:
             print(f"Error validating {platform} API key: {e}")
             return False
     
+    def get_data(self, platform: str, action: str, params: Dict[str, Any] = None,
+                 use_cache: bool = True, all_pages: bool = False) -> Dict[str, Any]:
+        """Dispatch a read to the platform's handler; raises ValueError for unknown platforms"""
+        handler = self.platforms.get(platform)
+        if handler is None:
+            raise ValueError(f"Unsupported platform: {platform}")
+        if platform in PAGINATED_ACTIONS:
+            # Only the platforms with real upstream reads go through the cache or paginate
+            return handler(action, params, use_cache=use_cache, all_pages=all_pages)
+        return handler(action, params)
+    
     # WooCommerce Integration (Read-only)
-    def get_woocommerce_data(self, action: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get data from WooCommerce API (read-only)"""
+    def get_woocommerce_data(self, action: str, params: Dict[str, Any] = None, use_cache: bool = True,
+                          all_pages: bool = False) -> Dict[str, Any]:
+        """Get data from WooCommerce API (read-only), through the local read-through cache
+
+        Returns one page by default. all_pages=True walks the pages of a list
+        action from params["page"] (default 1), at most INTEGRATION_MAX_PAGES of
+        them, and flags the result as truncated with the next page to resume
+        from when that cap is hit.
+        """
         try:
             if not all([self.woo_consumer_key, self.woo_consumer_secret, self.woo_api_url]):
                 return {"error": "WooCommerce credentials not configured"}
-            
-            base_url = f"{self.woo_api_url}/wp-json/wc/v3"
-            auth = (self.woo_consumer_key, self.woo_consumer_secret)
-            
-            if action == 'customers':
-                response = requests.get(f"{base_url}/customers", auth=auth, params=params or {})
-            elif action == 'orders':
-                response = requests.get(f"{base_url}/orders", auth=auth, params=params or {})
-            elif action == 'products':
-                response = requests.get(f"{base_url}/products", auth=auth, params=params or {})
-            elif action == 'reports':
-                response = requests.get(f"{base_url}/reports", auth=auth, params=params or {})
-            else:
+            if action not in WOOCOMMERCE_ACTIONS:
                 return {"error": f"Unsupported WooCommerce action: {action}"}
             
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                return {"error": f"WooCommerce API error: {response.status_code} - {response.text}"}
-                
+            all_pages = all_pages and action in PAGINATED_ACTIONS['woocommerce']
+            return self.cache.get_or_fetch(
+                'woocommerce', action, dict(params or {}, all_pages=True) if all_pages else params,
+                lambda conditional: self._fetch_woocommerce(action, params or {}, conditional, all_pages), use_cache
+            )
+        except RuntimeError as e:
+            return {"error": str(e)}
         except Exception as e:
             return {"error": f"WooCommerce integration error: {str(e)}"}
     
+    def _fetch_woocommerce(self, action: str, params: Dict[str, Any], conditional: Dict[str, str],
+                       all_pages: bool = False) -> Tuple:
+        if all_pages:
+            return 200, self._collect_pages(self.iter_woocommerce_pages, action, params), None, None
+        
+        response = self.session.get(
+            f"{self.woo_api_url}/wp-json/wc/v3/{action}", auth=(self.woo_consumer_key, self.woo_consumer_secret),
+            params=params, headers=conditional, timeout=self.timeout
+        )
+        return self._conditional_result(response, "WooCommerce")
+    
     # MerchantGuy Integration (Read-only)
-    def get_merchantguy_data(self, action: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Get data from MerchantGuy API (read-only)"""
+    def get_merchantguy_data(self, action: str, params: Dict[str, Any] = None, use_cache: bool = True,
+                          all_pages: bool = False) -> Dict[str, Any]:
+        """Get data from MerchantGuy API (read-only), through the local read-through cache
+
+        Returns one page by default. all_pages=True walks the pages of a list
+        action from params["page"] (default 1), at most INTEGRATION_MAX_PAGES of
+        them, and flags the result as truncated with the next page to resume
+        from when that cap is hit.
+        """
         try:
             if not all([self.merchantguy_api_key, self.merchantguy_gateway_url]):
                 return {"error": "MerchantGuy credentials not configured"}
-            
-            base_url = f"{self.merchantguy_gateway_url}/api/v1"
-            headers = {"Authorization": f"Bearer {self.merchantguy_api_key}"}
-            
-            if action == 'transactions':
-                response = requests.get(f"{base_url}/transactions", headers=headers, params=params or {})
-            elif action == 'reports':
-                response = requests.get(f"{base_url}/reports", headers=headers, params=params or {})
-            elif action == 'analytics':
-                response = requests.get(f"{base_url}/analytics", headers=headers, params=params or {})
-            else:
+            if action not in MERCHANTGUY_ACTIONS:
                 return {"error": f"Unsupported MerchantGuy action: {action}"}
             
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            else:
-                return {"error": f"MerchantGuy API error: {response.status_code} - {response.text}"}
-                
+            all_pages = all_pages and action in PAGINATED_ACTIONS['merchantguy']
+            return self.cache.get_or_fetch(
+                'merchantguy', action, dict(params or {}, all_pages=True) if all_pages else params,
+                lambda conditional: self._fetch_merchantguy(action, params or {}, conditional, all_pages), use_cache
+            )
+        except RuntimeError as e:
+            return {"error": str(e)}
         except Exception as e:
             return {"error": f"MerchantGuy integration error: {str(e)}"}
     
+    def _fetch_merchantguy(self, action: str, params: Dict[str, Any], conditional: Dict[str, str],
+                       all_pages: bool = False) -> Tuple:
+        if all_pages:
+            return 200, self._collect_pages(self.iter_merchantguy_pages, action, params), None, None
+        
+        response = self.session.get(
+            f"{self.merchantguy_gateway_url}/api/v1/{action}",
+            headers={"Authorization": f"Bearer {self.merchantguy_api_key}", **conditional},
+            params=params, timeout=self.timeout
+        )
+        return self._conditional_result(response, "MerchantGuy")
+    
+    def _collect_pages(self, iter_pages: Callable, action: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Concatenate every page of a list action into one payload, flagging truncation at max_pages"""
+        state = {}
+        records = list(itertools.chain.from_iterable(iter_pages(action, params, state=state)))
+        return {"success": True, "data": records, "total": len(records), "pages": state["pages"],
+                "truncated": state["truncated"], "next_page": state["next_page"]}
+    
+    @staticmethod
+    def _conditional_result(response, platform_name: str) -> Tuple:
+        """(status, payload, etag, last_modified) for the cache; upstream errors raise RuntimeError"""
+        if response.status_code == 304:
+            return 304, None, None, None
+        if response.status_code != 200:
+            raise RuntimeError(f"{platform_name} API error: {response.status_code} - {response.text}")
+        return (200, {"success": True, "data": response.json()},
+                response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    
+    # Paginated reads
+    def iter_pages(self, platform: str, action: str, params: Dict[str, Any] = None,
+                   state: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield every page of a paginated list action, in page order, up to max_pages
+
+        If given, state is filled in as pages arrive with "pages" (fetched so
+        far), "truncated" (stopped at max_pages with more possibly left) and
+        "next_page" (where to resume when truncated).
+        """
+        if action not in PAGINATED_ACTIONS.get(platform, ()):
+            raise ValueError(f"{platform}/{action} is not a paginated action")
+        if platform == 'woocommerce':
+            return self.iter_woocommerce_pages(action, params, state)
+        return self.iter_merchantguy_pages(action, params, state)
+    
+    def iter_woocommerce_pages(self, action: str, params: Dict[str, Any] = None,
+                               state: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield all pages of a WooCommerce list endpoint, fetching pages after the first concurrently
+        
+        X-WP-TotalPages from the first response tells us how many pages to request.
+        """
+        if not all([self.woo_consumer_key, self.woo_consumer_secret, self.woo_api_url]):
+            raise RuntimeError("WooCommerce credentials not configured")
+        url = f"{self.woo_api_url}/wp-json/wc/v3/{action}"
+        auth = (self.woo_consumer_key, self.woo_consumer_secret)
+        params = {"per_page": self.page_size, **(params or {})}
+        start = int(params.pop("page", 1))
+        
+        def fetch_page(page: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+            response = self.session.get(url, auth=auth, params={**params, "page": page}, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f"WooCommerce API error: {response.status_code} - {response.text}")
+            total_pages = response.headers.get('X-WP-TotalPages')
+            return response.json(), int(total_pages) if total_pages else None
+        
+        return self._iter_pages(fetch_page, int(params["per_page"]), {} if state is None else state, start)
+    
+    def iter_merchantguy_pages(self, action: str, params: Dict[str, Any] = None,
+                               state: Optional[Dict[str, Any]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield all pages of a MerchantGuy list endpoint, fetching pages after the first concurrently
+        
+        Uses the total page count from X-Total-Pages or a total_pages body field
+        when present; otherwise pages are fetched ahead in windows until a short page.
+        """
+        if not all([self.merchantguy_api_key, self.merchantguy_gateway_url]):
+            raise RuntimeError("MerchantGuy credentials not configured")
+        url = f"{self.merchantguy_gateway_url}/api/v1/{action}"
+        headers = {"Authorization": f"Bearer {self.merchantguy_api_key}"}
+        params = {"per_page": self.page_size, **(params or {})}
+        start = int(params.pop("page", 1))
+        
+        def fetch_page(page: int) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+            response = self.session.get(url, headers=headers, params={**params, "page": page}, timeout=self.timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f"MerchantGuy API error: {response.status_code} - {response.text}")
+            body = response.json()
+            total_pages = response.headers.get('X-Total-Pages')
+            if isinstance(body, dict):
+                total_pages = total_pages or body.get('total_pages')
+                body = body.get('data') or body.get(action) or []
+            return body, int(total_pages) if total_pages else None
+        
+        return self._iter_pages(fetch_page, int(params["per_page"]), {} if state is None else state, start)
+    
+    def _iter_pages(self, fetch_page: Callable[[int], Tuple[List[Dict[str, Any]], Optional[int]]],
+                    per_page: int, state: Dict[str, Any], start: int = 1) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages start, start + 1, ... in order, at most max_pages of them"""
+        last = start + self.max_pages - 1
+        state.update(pages=0, truncated=False, next_page=None)
+        records, total_pages = fetch_page(start)
+        state["pages"] = 1
+        if records:
+            yield records
+        if total_pages is not None:
+            for records, _ in self._fetch_ordered(fetch_page, range(start + 1, min(total_pages, last) + 1)):
+                state["pages"] += 1
+                if records:
+                    yield records
+            if total_pages > last:
+                state.update(truncated=True, next_page=last + 1)
+            return
+        if len(records) < per_page:
+            return
+        
+        # Total unknown: fetch ahead one window of pages at a time until a short page
+        page = start + 1
+        while page <= last:
+            window = range(page, min(page + self.fetch_concurrency, last + 1))
+            for records, _ in self._fetch_ordered(fetch_page, window):
+                state["pages"] += 1
+                if records:
+                    yield records
+                if len(records) < per_page:
+                    return
+            page = window.stop
+        # The cap was reached on a full page, so there may be more
+        state.update(truncated=True, next_page=last + 1)
+    
+    def _fetch_ordered(self, fetch_page: Callable[[int], Any], pages: Iterable[int]) -> Iterator[Any]:
+        """Run fetch_page over pages on the shared pool, at most fetch_concurrency ahead, yielding in order"""
+        pages = iter(pages)
+        pending = deque(self._fetch_pool.submit(fetch_page, page)
+                        for page in itertools.islice(pages, self.fetch_concurrency))
+        try:
+            while pending:
+                result = pending.popleft().result()
+                page = next(pages, None)
+                if page is not None:
+                    pending.append(self._fetch_pool.submit(fetch_page, page))
+                yield result
+        finally:
+            # A consumer that stops early should not leave queued page requests behind
+            for future in pending:
+                future.cancel()
+    
     # Google Analytics Integration
     def get_google_analytics_data(self, action: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Get data from Google Analytics API"""
@@ -0,0 +1,214 @@
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+
+# Order statuses that count as a sale; refunded orders stay in gross revenue and are netted out via their refunds
+SALE_STATUSES = ('completed', 'processing', 'on-hold', 'refunded')
+
+# MerchantGuy transaction types on each side of the refund rate
+SALE_TRANSACTION_TYPES = ('sale', 'capture')
+REFUND_TRANSACTION_TYPES = ('refund', 'credit')
+
+TOP_PRODUCT_METRICS = ('revenue', 'quantity', 'orders')
+
+# Refund totals are negative in WooCommerce's refunds array
+ORDERS_QUERY = (
+    "SELECT id, status, total, customer_id, billing_email, date_created, "
+    "COALESCE((SELECT -SUM(CAST(json_extract(value, '$.total') AS REAL)) "
+    "FROM json_each(orders.raw, '$.refunds')), 0) AS refunded "
+    "FROM orders WHERE status IN ({statuses})"
+)
+
+
+class CommerceAnalytics:
+    """Vectorized aggregations over the local commerce store written by CommerceSyncService
+
+    Every metric is computed with pandas group-bys over frames read straight
+    from SQLite, so results come from the synced data without any upstream
+    calls. Each public method returns JSON-ready rows; to_table() and
+    llm_context() render the same frames as compact CSV for prompts.
+    """
+
+    def __init__(self, db_path: str = "../storage/commerce/commerce.sqlite3"):
+        self.db_path = db_path
+
+    def _read(self, query: str, params: tuple = (), numeric: tuple = ()) -> pd.DataFrame:
+        """Run a query into a frame; numeric columns are coerced so empty results still aggregate"""
+        # A connection per read: WAL lets it run alongside a sync in progress
+        conn = sqlite3.connect(self.db_path)
+        try:
+            frame = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+        for column in numeric:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype(float)
+        return frame
+
+    @staticmethod
+    def _timestamps(series: pd.Series) -> pd.Series:
+        """Parse ISO-8601 strings as naive UTC; unparseable values become NaT"""
+        return pd.to_datetime(series, errors='coerce', utc=True, format='ISO8601').dt.tz_localize(None)
+
+    @staticmethod
+    def _since(days: int) -> datetime:
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+
+    def _orders(self, since: Optional[datetime] = None) -> pd.DataFrame:
+        """Sale orders with a parsed creation time, a customer key and refunded value"""
+        placeholders = ", ".join("?" for _ in SALE_STATUSES)
+        orders = self._read(ORDERS_QUERY.format(statuses=placeholders), SALE_STATUSES,
+                            numeric=("id", "total", "customer_id", "refunded"))
+        orders["created"] = self._timestamps(orders["date_created"])
+        orders = orders.dropna(subset=["created"])
+        orders["total"] = orders["total"].fillna(0.0)
+        # Guests have customer_id 0, so fall back to their billing email
+        orders["customer"] = np.where(orders["customer_id"].fillna(0) > 0,
+                                      "id:" + orders["customer_id"].fillna(0).astype(int).astype(str),
+                                      "email:" + orders["billing_email"].fillna("").str.lower())
+        orders.loc[orders["customer"] == "email:", "customer"] = None
+        if since is not None:
+            orders = orders[orders["created"] >= since]
+        return orders
+
+    @staticmethod
+    def _records(frame: pd.DataFrame, rates: tuple = ()) -> List[Dict[str, Any]]:
+        """JSON-ready rows: money to cents, rate columns to four places, NaN as None"""
+        frame = frame.round({column: 4 if column in rates else 2 for column in frame.columns})
+        return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+    # Metrics -------------------------------------------------------------
+
+    def revenue_by_day_frame(self, days: int = 30) -> pd.DataFrame:
+        since = self._since(days)
+        orders = self._orders(since)
+        daily = orders.groupby(orders["created"].dt.normalize()).agg(
+            orders=("id", "size"), gross_revenue=("total", "sum"), refunds=("refunded", "sum")
+        )
+        # Days without orders are zeros, not gaps
+        daily = daily.reindex(pd.date_range(since, periods=days, freq="D"), fill_value=0)
+        daily["net_revenue"] = daily["gross_revenue"] - daily["refunds"]
+        daily["aov"] = (daily["gross_revenue"] / daily["orders"].replace(0, np.nan)).fillna(0.0)
+        daily.index = daily.index.strftime("%Y-%m-%d")
+        return daily.rename_axis("date").reset_index()
+
+    def revenue_by_day(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Orders, gross/net revenue, refunds and AOV per UTC day"""
+        return self._records(self.revenue_by_day_frame(days))
+
+    def summary(self, days: int = 30) -> Dict[str, Any]:
+        """Headline numbers for the period: revenue, AOV, customers and refund rate"""
+        orders = self._orders(self._since(days))
+        gross = float(orders["total"].sum())
+        refunds = float(orders["refunded"].sum())
+        count = len(orders)
+        return {
+            "days": days,
+            "orders": count,
+            "customers": int(orders["customer"].nunique()),
+            "gross_revenue": round(gross, 2),
+            "refunds": round(refunds, 2),
+            "net_revenue": round(gross - refunds, 2),
+            "aov": round(gross / count, 2) if count else 0.0,
+            "refund_rate": round(refunds / gross, 4) if gross else 0.0
+        }
+
+    def top_products_frame(self, days: int = 30, limit: int = 10, by: str = 'revenue') -> pd.DataFrame:
+        if by not in TOP_PRODUCT_METRICS:
+            raise ValueError(f"by must be one of: {', '.join(TOP_PRODUCT_METRICS)}")
+        orders = self._orders(self._since(days))
+        items = self._read("SELECT order_id, product_id, sku, name, quantity, total FROM order_items",
+                           numeric=("order_id", "quantity", "total"))
+        items = items[items["order_id"].isin(orders["id"])].copy()
+        # Products without a SKU are grouped by name
+        items["sku"] = items["sku"].replace("", np.nan).fillna("(no sku) " + items["name"].fillna(""))
+        products = items.groupby("sku").agg(
+            name=("name", "first"), quantity=("quantity", "sum"), revenue=("total", "sum"),
+            orders=("order_id", "nunique")
+        )
+        products["share"] = products["revenue"] / products["revenue"].sum() if len(products) else products["revenue"]
+        return products.nlargest(limit, by).rename_axis("sku").reset_index()
+
+    def top_products(self, days: int = 30, limit: int = 10, by: str = 'revenue') -> List[Dict[str, Any]]:
+        """Best-selling SKUs by revenue, quantity or order count, with their share of item revenue"""
+        return self._records(self.top_products_frame(days, limit, by), rates=("share",))
+
+    def refund_rates(self, days: int = 30) -> Dict[str, Any]:
+        """Refund rates by value and by order count, per week, plus processor-side rates from transactions"""
+        since = self._since(days)
+        orders = self._orders(since)
+        orders["has_refund"] = orders["refunded"] > 0
+        weekly = orders.groupby(orders["created"].dt.to_period("W").dt.start_time).agg(
+            orders=("id", "size"), refunded_orders=("has_refund", "sum"),
+            gross_revenue=("total", "sum"), refunds=("refunded", "sum")
+        )
+        weekly["value_rate"] = (weekly["refunds"] / weekly["gross_revenue"].replace(0, np.nan)).fillna(0.0)
+        weekly["order_rate"] = weekly["refunded_orders"] / weekly["orders"]
+        weekly.index = weekly.index.strftime("%Y-%m-%d")
+
+        transactions = self._read("SELECT type, amount, created_at FROM transactions", numeric=("amount",))
+        transactions["created"] = self._timestamps(transactions["created_at"])
+        transactions = transactions[transactions["created"] >= since]
+        kind = transactions["type"].fillna("").str.lower()
+        sales = float(transactions.loc[kind.isin(SALE_TRANSACTION_TYPES), "amount"].abs().sum())
+        refunded = float(transactions.loc[kind.isin(REFUND_TRANSACTION_TYPES), "amount"].abs().sum())
+
+        gross = float(orders["total"].sum())
+        return {
+            "days": days,
+            "orders": {
+                "value_rate": round(float(orders["refunded"].sum()) / gross, 4) if gross else 0.0,
+                "order_rate": round(float(orders["has_refund"].mean()), 4) if len(orders) else 0.0,
+                "weekly": self._records(weekly.rename_axis("week").reset_index(), rates=("value_rate", "order_rate"))
+            },
+            "transactions": {
+                "sales": round(sales, 2),
+                "refunds": round(refunded, 2),
+                "value_rate": round(refunded / sales, 4) if sales else 0.0
+            }
+        }
+
+    def cohort_retention_frame(self, months: int = 6) -> pd.DataFrame:
+        if months < 1:
+            raise ValueError("months must be at least 1")
+        orders = self._orders().dropna(subset=["customer"])
+        if orders.empty:
+            return pd.DataFrame(columns=["cohort", "customers"] + [f"m{offset}" for offset in range(months)])
+        month = orders["created"].dt.year * 12 + orders["created"].dt.month - 1
+        cohort = month.groupby(orders["customer"]).transform("min")
+        orders = orders.assign(cohort=cohort, offset=month - cohort)
+        counts = orders.pivot_table(index="cohort", columns="offset", values="customer", aggfunc="nunique")
+        counts = counts.reindex(columns=range(months), fill_value=np.nan).tail(months)
+        retention = counts.div(counts[0], axis=0)
+        retention.columns = [f"m{offset}" for offset in retention.columns]
+        retention.insert(0, "customers", counts[0].fillna(0).astype(int))
+        retention.index = [f"{value // 12:04d}-{value % 12 + 1:02d}" for value in retention.index]
+        return retention.rename_axis("cohort").reset_index()
+
+    def cohort_retention(self, months: int = 6) -> List[Dict[str, Any]]:
+        """Share of each first-order-month cohort ordering again N months later (m0 is always 1)"""
+        retention = self.cohort_retention_frame(months)
+        return self._records(retention, rates=tuple(column for column in retention.columns if column[1:].isdigit()))
+
+    # Prompt tables -------------------------------------------------------
+
+    @staticmethod
+    def to_table(frame: pd.DataFrame) -> str:
+        """Compact CSV rendering of a metric frame for an LLM prompt"""
+        return frame.round(2).to_csv(index=False).strip()
+
+    def llm_context(self, days: int = 30, limit: int = 10) -> str:
+        """Computed tables that stand in for raw commerce records in a chat prompt"""
+        summary = self.summary(days)
+        sections = [
+            f"Store summary, last {days} days (UTC): " + ", ".join(f"{key}={value}" for key, value in summary.items()
+                                                                     if key != "days"),
+            "Revenue by day:\n" + self.to_table(self.revenue_by_day_frame(days)),
+            f"Top {limit} products by revenue:\n" + self.to_table(self.top_products_frame(days, limit)),
+            "Monthly cohort retention (share of customers ordering again):\n" + self.to_table(
+                self.cohort_retention_frame())
+        ]
+        return "\n\n".join(sections)
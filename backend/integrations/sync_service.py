@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+# entity -> (platform, action, cursor query parameter or None for a full refresh)
+SYNC_ENTITIES = {
+    'orders': ('woocommerce', 'orders', 'modified_after'),
+    'customers': ('woocommerce', 'customers', None),
+    'products': ('woocommerce', 'products', 'modified_after'),
+    'transactions': ('merchantguy', 'transactions', 'updated_after')
+}
+
+# Re-read this much before the watermark so records sharing its timestamp are never missed; upserts make it harmless
+WATERMARK_OVERLAP = timedelta(minutes=1)
+
+SCHEMA = {
+    'orders': (
+        "id INTEGER PRIMARY KEY, number TEXT, status TEXT, currency TEXT, total REAL, discount_total REAL, "
+        "shipping_total REAL, total_tax REAL, customer_id INTEGER, billing_email TEXT, payment_method TEXT, "
+        "date_created TEXT, date_modified TEXT, date_paid TEXT, date_completed TEXT, raw TEXT NOT NULL"
+    ),
+    'order_items': (
+        "order_id INTEGER NOT NULL, item_id INTEGER NOT NULL, product_id INTEGER, variation_id INTEGER, sku TEXT, "
+        "name TEXT, quantity REAL, subtotal REAL, total REAL, PRIMARY KEY (order_id, item_id)"
+    ),
+    'customers': (
+        "id INTEGER PRIMARY KEY, email TEXT, first_name TEXT, last_name TEXT, role TEXT, "
+        "date_created TEXT, date_modified TEXT, raw TEXT NOT NULL"
+    ),
+    'products': (
+        "id INTEGER PRIMARY KEY, sku TEXT, name TEXT, type TEXT, status TEXT, price REAL, regular_price REAL, "
+        "stock_quantity REAL, total_sales REAL, date_created TEXT, date_modified TEXT, raw TEXT NOT NULL"
+    ),
+    'transactions': (
+        "id TEXT PRIMARY KEY, type TEXT, status TEXT, amount REAL, currency TEXT, order_id TEXT, "
+        "customer_email TEXT, created_at TEXT, updated_at TEXT, raw TEXT NOT NULL"
+    )
+}
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_orders_date_created ON orders(date_created)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id)",
+    "CREATE INDEX IF NOT EXISTS idx_order_items_sku ON order_items(sku)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_created ON transactions(created_at)"
+)
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse an ISO-8601 watermark; anything else means the next run is a full refresh"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _first(record: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        if record.get(key) not in (None, ''):
+            return record[key]
+    return None
+
+
+class CommerceSyncService:
+    """Incremental sync of WooCommerce and MerchantGuy records into a local SQLite store
+
+    Each entity keeps a watermark (the newest modification time seen), so a run
+    only asks the upstream for records modified since the last one. The
+    watermark is persisted only after a run completes, so an interrupted run
+    is simply repeated. Reads never touch the network.
+    """
+
+    def __init__(self, api_service, db_path: str = "../storage/commerce/commerce.sqlite3"):
+        self.api_service = api_service
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._running = set()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for table, columns in SCHEMA.items():
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        for statement in INDEXES:
+            self._conn.execute(statement)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            "entity TEXT PRIMARY KEY, watermark TEXT, last_run_at REAL, last_duration REAL, "
+            "records_synced INTEGER NOT NULL DEFAULT 0, status TEXT, error TEXT)"
+        )
+        self._conn.commit()
+
+    # Sync ----------------------------------------------------------------
+
+    def sync(self, entities: Optional[List[str]] = None, full: bool = False) -> Dict[str, Any]:
+        """Sync the given entities (default: all), incrementally unless full=True"""
+        entities = entities or list(SYNC_ENTITIES)
+        unknown = [entity for entity in entities if entity not in SYNC_ENTITIES]
+        if unknown:
+            raise ValueError(f"Unknown sync entities: {', '.join(unknown)}")
+        return {entity: self.sync_entity(entity, full) for entity in entities}
+
+    def sync_entity(self, entity: str, full: bool = False) -> Dict[str, Any]:
+        platform, action, cursor_param = SYNC_ENTITIES[entity]
+        with self._lock:
+            if entity in self._running:
+                return {"status": "skipped", "reason": "sync already running"}
+            self._running.add(entity)
+
+        started = time.perf_counter()
+        try:
+            state = self.get_state(entity)
+            watermark = None if full else state.get("watermark")
+            params = {}
+            since = _parse_timestamp(watermark) if cursor_param and watermark else None
+            if since:
+                params[cursor_param] = (since - WATERMARK_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S")
+                if platform == 'woocommerce':
+                    params["dates_are_gmt"] = "true"
+
+            page_state = {}
+            try:
+                pages = self.api_service.iter_pages(platform, action, params, state=page_state)
+            except RuntimeError as e:
+                # Platform not configured
+                self._save_state(entity, state.get("watermark"), 0, 0.0, "skipped", str(e))
+                return {"status": "skipped", "reason": str(e)}
+
+            synced, newest = 0, watermark
+            for page in pages:
+                page_newest = self._upsert(entity, page)
+                synced += len(page)
+                if page_newest and (newest is None or page_newest > newest):
+                    newest = page_newest
+
+            elapsed = time.perf_counter() - started
+            if page_state.get("truncated"):
+                # Pages are not ordered by modification time, so records past the cap may be older than
+                # newest; keep the previous watermark so the next run picks them up
+                error = f"Stopped at the page cap; page {page_state['next_page']} onwards not synced"
+                self._save_state(entity, state.get("watermark"), synced, elapsed, "truncated", error)
+                return {"status": "truncated", "records": synced, "watermark": state.get("watermark"),
+                        "next_page": page_state["next_page"], "incremental": bool(params),
+                        "seconds": round(elapsed, 3)}
+            self._save_state(entity, newest, synced, elapsed, "ok", None)
+            return {"status": "ok", "records": synced, "watermark": newest, "incremental": bool(params),
+                    "seconds": round(elapsed, 3)}
+        except Exception as e:
+            self._save_state(entity, self.get_state(entity).get("watermark"), 0,
+                             time.perf_counter() - started, "error", str(e))
+            return {"status": "error", "error": str(e)}
+        finally:
+            with self._lock:
+                self._running.discard(entity)
+
+    def _upsert(self, entity: str, records: List[Dict[str, Any]]) -> Optional[str]:
+        """Write one page of records; returns the newest modification time in it"""
+        rows = [getattr(self, f"_{entity}_row")(record) for record in records]
+        rows = [row for row in rows if row[0] is not None]
+        if not rows:
+            return None
+        columns = [column.split()[0] for column in SCHEMA[entity].split(", ")]
+        placeholders = ", ".join("?" for _ in columns)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {entity} ({', '.join(columns)}) VALUES ({placeholders})",
+                [row[:-1] for row in rows]
+            )
+            if entity == 'orders':
+                order_ids = [(row[0],) for row in rows]
+                self._conn.executemany("DELETE FROM order_items WHERE order_id = ?", order_ids)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO order_items "
+                    "(order_id, item_id, product_id, variation_id, sku, name, quantity, subtotal, total) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [item for record in records for item in self._order_item_rows(record)]
+                )
+            self._conn.commit()
+        modified = [row[-1] for row in rows if row[-1]]
+        return max(modified) if modified else None
+
+    # Each *_row returns the table's columns in order, plus the record's modification time last
+
+    @staticmethod
+    def _orders_row(record: Dict[str, Any]) -> Tuple:
+        billing = record.get('billing') or {}
+        modified = record.get('date_modified_gmt') or record.get('date_modified')
+        return (
+            record.get('id'), str(record.get('number') or record.get('id')), record.get('status'),
+            record.get('currency'), _number(record.get('total')), _number(record.get('discount_total')),
+            _number(record.get('shipping_total')), _number(record.get('total_tax')), record.get('customer_id'),
+            billing.get('email'), record.get('payment_method'),
+            record.get('date_created_gmt') or record.get('date_created'), modified,
+            record.get('date_paid_gmt') or record.get('date_paid'),
+            record.get('date_completed_gmt') or record.get('date_completed'),
+            json.dumps(record), modified
+        )
+
+    @staticmethod
+    def _order_item_rows(record: Dict[str, Any]) -> List[Tuple]:
+        return [
+            (record.get('id'), item.get('id'), item.get('product_id'), item.get('variation_id'), item.get('sku'),
+             item.get('name'), _number(item.get('quantity')), _number(item.get('subtotal')), _number(item.get('total')))
+            for item in record.get('line_items') or []
+            if record.get('id') is not None and item.get('id') is not None
+        ]
+
+    @staticmethod
+    def _customers_row(record: Dict[str, Any]) -> Tuple:
+        modified = record.get('date_modified_gmt') or record.get('date_modified')
+        return (
+            record.get('id'), record.get('email'), record.get('first_name'), record.get('last_name'),
+            record.get('role'), record.get('date_created_gmt') or record.get('date_created'), modified,
+            json.dumps(record), modified
+        )
+
+    @staticmethod
+    def _products_row(record: Dict[str, Any]) -> Tuple:
+        modified = record.get('date_modified_gmt') or record.get('date_modified')
+        return (
+            record.get('id'), record.get('sku'), record.get('name'), record.get('type'), record.get('status'),
+            _number(record.get('price')), _number(record.get('regular_price')),
+            _number(record.get('stock_quantity')), _number(record.get('total_sales')),
+            record.get('date_created_gmt') or record.get('date_created'), modified, json.dumps(record), modified
+        )
+
+    @staticmethod
+    def _transactions_row(record: Dict[str, Any]) -> Tuple:
+        transaction_id = _first(record, 'id', 'transaction_id')
+        modified = _first(record, 'updated_at', 'date_modified', 'created_at', 'date')
+        return (
+            str(transaction_id) if transaction_id is not None else None,
+            _first(record, 'type', 'transaction_type'), _first(record, 'status', 'condition'),
+            _number(_first(record, 'amount', 'total')), _first(record, 'currency'),
+            str(_first(record, 'order_id', 'orderid') or '') or None, _first(record, 'customer_email', 'email'),
+            _first(record, 'created_at', 'date'), modified, json.dumps(record), modified
+        )
+
+    # State and local reads -------------------------------------------------
+
+    def _save_state(self, entity: str, watermark: Optional[str], records: int, duration: float,
+                    status: str, error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sync_state (entity, watermark, last_run_at, last_duration, records_synced, status, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(entity) DO UPDATE SET watermark = excluded.watermark, "
+                "last_run_at = excluded.last_run_at, last_duration = excluded.last_duration, "
+                "records_synced = excluded.records_synced, status = excluded.status, error = excluded.error",
+                (entity, watermark, time.time(), round(duration, 3), records, status, error)
+            )
+            self._conn.commit()
+
+    def get_state(self, entity: str) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM sync_state WHERE entity = ?", (entity,)).fetchone()
+        return dict(row) if row else {}
+
+    def get_status(self) -> Dict[str, Any]:
+        """Sync state and local row count per entity"""
+        status = {}
+        for entity in SYNC_ENTITIES:
+            with self._lock:
+                count = self._conn.execute(f"SELECT COUNT(*) FROM {entity}").fetchone()[0]
+            status[entity] = {**self.get_state(entity), "rows": count, "running": entity in self._running}
+        return status
+
+    def query(self, entity: str, limit: int = 100, offset: int = 0,
+              modified_since: Optional[str] = None) -> Dict[str, Any]:
+        """Read synced records locally, newest modification first"""
+        if entity not in SYNC_ENTITIES:
+            raise ValueError(f"Unknown sync entity: {entity}")
+        modified_column = 'updated_at' if entity == 'transactions' else 'date_modified'
+        where, args = "", []
+        if modified_since:
+            where, args = f"WHERE {modified_column} >= ?", [modified_since]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT raw FROM {entity} {where} ORDER BY {modified_column} DESC LIMIT ? OFFSET ?",
+                args + [limit, offset]
+            ).fetchall()
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {entity} {where}", args).fetchone()[0]
+        return {"records": [json.loads(row[0]) for row in rows], "total": total, "limit": limit, "offset": offset}
@@ -1,15 +1,32 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 import os
+import json
+import uuid
+import shutil
+import asyncio
+import time
 import pandas as pd
 from dotenv import load_dotenv
 from typing import Dict, Any, List, Optional
-from core.llm_service import LLMService
+from core.llm_service import LLMService, is_error_response
+from core.response_cache import ResponseCache
 from core.rag_service import RAGService
 from core.export_service import ExportService
-from integrations.api_service import api_service
+from core.ingestion_jobs import IngestionJobManager
+from core.context_packer import ContextPacker
+from core.key_validation import KeyValidator
+from core.chat_sessions import ChatSessionStore, ConversationMemory
+from core.extraction import expand_zip
+from core.metrics import (metrics, chat_stage_seconds, chat_requests_total, export_seconds, exports_total,
+                          integration_seconds, integration_requests_total, http_request_seconds)
+from integrations.api_service import api_service, PLATFORM_ACTIONS
+from integrations.sync_service import CommerceSyncService
+from integrations.commerce_analytics import CommerceAnalytics
 
 load_dotenv()
 
@@ -24,106 +41,449 @@ app.add_middleware(
 )
 
 # Initialize services
-llm_service = LLMService()
 rag_service = RAGService()
+llm_service = LLMService(response_cache=ResponseCache(
+    ttl=float(os.getenv('LLM_CACHE_TTL', 86400)),
+    max_entries=int(os.getenv('LLM_CACHE_MAX', 5000)),
+    embedding_function=rag_service.embedding_function if os.getenv('LLM_SEMANTIC_CACHE', 'false').lower() == 'true' else None,
+    similarity_threshold=float(os.getenv('LLM_SEMANTIC_THRESHOLD', 0.95))
+))
 export_service = ExportService()
+ingestion_jobs = IngestionJobManager(rag_service, max_workers=int(os.getenv('RAG_INGEST_WORKERS', 2)))
+
+key_validator = KeyValidator(llm_service, api_service)
+commerce_sync = CommerceSyncService(api_service)
+commerce_analytics = CommerceAnalytics(commerce_sync.db_path)
+
+context_packer = ContextPacker(default_budget=int(os.getenv('RAG_CONTEXT_TOKENS', 1500)),
+                               reserved_output_tokens=LLMService.MAX_OUTPUT_TOKENS)
+chat_sessions = ChatSessionStore()
+conversation_memory = ConversationMemory(
+    chat_sessions, llm_service, context_packer,
+    history_tokens=int(os.getenv('CHAT_HISTORY_TOKENS', 1200)),
+    window_turns=int(os.getenv('CHAT_WINDOW_TURNS', 8))
+)
+
+RAG_CHAT_CANDIDATES = int(os.getenv('RAG_CHAT_CANDIDATES', 8))
+UPLOAD_TEMP_DIR = "../storage/temp"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ZIP_MAX_BYTES = int(float(os.getenv('ZIP_MAX_MB', 512)) * 1024 * 1024)
+ZIP_MAX_MEMBERS = int(os.getenv('ZIP_MAX_MEMBERS', 1000))
+INTEGRATION_BATCH_MAX = int(os.getenv('INTEGRATION_BATCH_MAX', 50))
+ANALYTICS_CONTEXT_TOKENS = int(os.getenv('ANALYTICS_CONTEXT_TOKENS', 800))
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep series bounded
+        route = request.scope.get("route")
+        http_request_seconds.observe(time.perf_counter() - started, method=request.method,
+                                     route=getattr(route, "path", "unmatched"), status=status)
+
+@app.on_event("shutdown")
+async def close_upstream_connections():
+    await llm_service.aclose()
 
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str
     model: str = "openai"
     use_rag: bool = True
+    rag_mode: str = "hybrid"
+    stream: bool = False
+    bypass_cache: bool = False
+    fallback: bool = False
+    hedge: bool = False
+    context_tokens: Optional[int] = None
+    session_id: Optional[str] = None
+    use_analytics: bool = False
+    analytics_days: int = 30
+
+class ChatSessionRequest(BaseModel):
+    title: str = ""
 
 class APIKeyRequest(BaseModel):
     platform: str
     api_key: str
 
+class SyncRequest(BaseModel):
+    entities: Optional[List[str]] = None
+    full: bool = False
+
+class IntegrationBatchItem(BaseModel):
+    platform: str
+    action: str
+    params: Optional[Dict[str, Any]] = None
+    id: Optional[str] = None
+    all_pages: bool = False
+
+class IntegrationBatchRequest(BaseModel):
+    items: List[IntegrationBatchItem]
+    timeout: float = 30.0
+    stream: bool = False
+    refresh: bool = False
+
 class ExportRequest(BaseModel):
     data: Dict[str, Any]
     format: str
     filename: Optional[str] = None
 
+def _provider_label(provider: str) -> str:
+    # Unknown providers share one label so user input cannot create unbounded series
+    return provider if provider in llm_service.providers else "unsupported"
+
+def _integration_labels(platform: str, action: str) -> Dict[str, str]:
+    if platform not in api_service.platforms:
+        return {"platform": "unsupported", "action": "unsupported"}
+    # Placeholder platforms accept any action, so only known actions get their own label
+    return {"platform": platform, "action": action if action in PLATFORM_ACTIONS.get(platform, ()) else "other"}
+
+def _retrieve_context(request: ChatRequest) -> Dict[str, Any]:
+    """Retrieve RAG passages for the chat message and pack them into the provider's token budget
+
+    Blocking (vector query, query embedding, keyword lookup), so callers run it in the threadpool.
+    """
+    if not request.use_rag:
+        return {"context": "", "tokens_used": 0, "budget": 0, "passages_used": 0,
+                "passages_dropped_duplicate": 0, "truncated": False}
+    # Get relevant chunks from RAG
+    with chat_stage_seconds.time(stage="retrieval", provider=_provider_label(request.model)):
+        passages = rag_service.search_chunks(request.message, n_results=RAG_CHAT_CANDIDATES, mode=request.rag_mode)
+    with chat_stage_seconds.time(stage="context_build", provider=_provider_label(request.model)):
+        return context_packer.pack(passages, provider=request.model, budget=request.context_tokens,
+                                   question=request.message)
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post('/chat')
 async def chat(request: ChatRequest):
     try:
-        context = ""
-        if request.use_rag:
-            # Get relevant context from RAG
-            rag_results = rag_service.query_documents(request.message, n_results=3)
-            if rag_results and rag_results.get('documents'):
-                context = "\n\n".join(rag_results['documents'][0])
+        provider_label = _provider_label(request.model)
         
-        # Prepare message with context
-        full_message = request.message
-        if context:
-            full_message = f"Context: {context}\n\nQuestion: {request.message}"
+        # Sessions prepend a bounded summary + recent-turn window to the message
+        prompt, history = request.message, None
+        if request.session_id:
+            if chat_sessions.get(request.session_id) is None:
+                raise HTTPException(status_code=404, detail=f"Chat session {request.session_id} not found")
+            with chat_stage_seconds.time(stage="context_build", provider=provider_label):
+                history = await run_in_threadpool(conversation_memory.build_prompt, request.session_id,
+                                                  request.message, request.model)
+            prompt = history.pop("prompt")
         
-        # Get LLM response
-        response = llm_service.send_request(request.model, full_message)
+        packed = await run_in_threadpool(_retrieve_context, request)
+        context = packed.pop("context")
+        
+        # Computed store metrics instead of raw commerce records
+        if request.use_analytics:
+            with chat_stage_seconds.time(stage="analytics", provider=provider_label):
+                analytics = await run_in_threadpool(commerce_analytics.llm_context, request.analytics_days)
+            analytics = context_packer.truncate(analytics, ANALYTICS_CONTEXT_TOKENS, request.model)
+            context = f"{analytics}\n\n{context}" if context else analytics
+        
+        if request.stream:
+            async def event_stream():
+                parts = []
+                started = time.perf_counter()
+                async for event in llm_service.stream_request(request.model, prompt=prompt, context=context,
+                                                              use_cache=not request.bypass_cache):
+                    event_type = event.pop("type")
+                    if event_type == "token":
+                        parts.append(event["text"])
+                    elif event_type == "error":
+                        chat_requests_total.inc(provider=provider_label, status="error")
+                    elif event_type == "done":
+                        chat_stage_seconds.observe(time.perf_counter() - started, stage="provider_call",
+                                                   provider=provider_label)
+                        if event["ttft_ms"] is not None:
+                            chat_stage_seconds.observe(event["ttft_ms"] / 1000, stage="ttft", provider=provider_label)
+                        chat_requests_total.inc(provider=provider_label, status="cached" if event["cached"] else "ok")
+                        event.update(rag_used=request.use_rag, context_found=bool(context), context_tokens=packed,
+                                     session_id=request.session_id, history=history)
+                        if request.session_id:
+                            conversation_memory.record_exchange(request.session_id, request.message,
+                                                                "".join(parts), request.model)
+                    yield _sse_event(event_type, event)
+            
+            return StreamingResponse(
+                event_stream(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        # Get LLM response, optionally failing over to (or hedging with) other providers
+        provider_started = time.perf_counter()
+        if request.fallback or request.hedge:
+            routed = await llm_service.route_request(
+                llm_service.fallback_chain(request.model), prompt=prompt, context=context,
+                hedge=request.hedge, use_cache=not request.bypass_cache
+            )
+            response, model_used = routed["response"], routed["provider"] or request.model
+        else:
+            response = await llm_service.send_request(request.model, prompt=prompt, context=context,
+                                                      use_cache=not request.bypass_cache)
+            model_used = request.model
+        chat_stage_seconds.observe(time.perf_counter() - provider_started, stage="provider_call",
+                                   provider=_provider_label(model_used))
+        chat_requests_total.inc(provider=_provider_label(model_used),
+                                status="error" if is_error_response(response) else "ok")
+        
+        if request.session_id and not is_error_response(response):
+            conversation_memory.record_exchange(request.session_id, request.message, response, model_used)
         
         return {
             "response": response,
-            "model_used": request.model,
+            "model_used": model_used,
             "rag_used": request.use_rag,
-            "context_found": bool(context)
+            "context_found": bool(context),
+            "context_tokens": packed,
+            "session_id": request.session_id,
+            "history": history
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Chat sessions
+@app.post('/chat/sessions')
+async def create_chat_session(request: Optional[ChatSessionRequest] = None):
+    try:
+        return chat_sessions.create((request or ChatSessionRequest()).title)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/chat/sessions')
+async def list_chat_sessions(limit: int = 50):
+    try:
+        return {"sessions": chat_sessions.list(limit)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post('/upload')
+@app.get('/chat/sessions/{session_id}')
+async def get_chat_session(session_id: str):
+    session = chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Chat session {session_id} not found")
+    return {**session, "turns": chat_sessions.turns(session_id)}
+
+@app.delete('/chat/sessions/{session_id}')
+async def delete_chat_session(session_id: str):
+    if not chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Chat session {session_id} not found")
+    return {"message": f"Chat session {session_id} deleted successfully"}
+
+@app.post('/upload', status_code=202)
 async def upload_file(file: UploadFile = File(...)):
     try:
-        # Save uploaded file temporarily
-        temp_path = f"../storage/temp/{file.filename}"
-        os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+        # Stream the upload to disk in chunks instead of reading it into memory
+        filename = os.path.basename(file.filename)
+        temp_path = os.path.join(UPLOAD_TEMP_DIR, f"{uuid.uuid4().hex}_{filename}")
+        os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
         
         with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer.write(chunk)
         
-        # Process file with RAG service
-        result = rag_service.process_file(temp_path, file.filename)
+        # Hand extraction and embedding to the background worker pool
+        file_type = os.path.splitext(filename)[1].lower()
+        job = ingestion_jobs.submit(temp_path, filename, file_type)
+        if job is None:
+            os.remove(temp_path)
+            raise HTTPException(status_code=503, detail="Ingestion queue is full, try again later")
         
-        # Clean up temp file
-        os.remove(temp_path)
-        
-        if result["success"]:
-            return {
-                "message": "File uploaded and processed successfully",
-                "filename": file.filename,
-                "file_type": result.get("file_type"),
-                "chunks_created": result.get("chunks_created", 0)
-            }
-        else:
-            raise HTTPException(status_code=400, detail=result["error"])
+        return {
+            "message": "File uploaded and queued for processing",
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "filename": filename,
+            "file_type": file_type
+        }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Integration endpoints
-@app.get('/integrations/{platform}/{action}')
-async def get_integration_data(platform: str, action: str, params: Optional[Dict[str, Any]] = None):
-    try:
-        if platform == 'woocommerce':
-            data = api_service.get_woocommerce_data(action, params)
-        elif platform == 'merchantguy':
-            data = api_service.get_merchantguy_data(action, params)
-        elif platform == 'google_analytics':
-            data = api_service.get_google_analytics_data(action, params)
-        elif platform == 'google_ads':
-            data = api_service.get_google_ads_data(action, params)
-        elif platform == 'facebook':
-            data = api_service.get_facebook_data(action, params)
-        elif platform == 'tiktok':
-            data = api_service.get_tiktok_data(action, params)
-        elif platform == 'twitter':
-            data = api_service.get_twitter_data(action, params)
-        elif platform == 'youtube':
-            data = api_service.get_youtube_data(action, params)
-        else:
-            raise HTTPException(status_code=400, detail=f"Unsupported platform: {platform}")
+@app.post('/upload/bulk')
+async def upload_files_bulk(files: List[UploadFile] = File(...)):
+    batch_dir = os.path.join(UPLOAD_TEMP_DIR, f"bulk_{uuid.uuid4().hex}")
+    try:
+        os.makedirs(batch_dir, exist_ok=True)
+        stored, skipped = [], []
+        for index, file in enumerate(files):
+            filename = os.path.basename(file.filename)
+            path = os.path.join(batch_dir, f"{index}_{filename}")
+            with open(path, "wb") as buffer:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    buffer.write(chunk)
+            
+            if filename.lower().endswith('.zip'):
+                try:
+                    members, archive_skipped = await run_in_threadpool(
+                        expand_zip, path, os.path.join(batch_dir, f"{index}_zip"), ZIP_MAX_BYTES, ZIP_MAX_MEMBERS
+                    )
+                    stored.extend(members)
+                    skipped.extend(archive_skipped)
+                except Exception as e:
+                    skipped.append(f"{filename}: {e}")
+            else:
+                stored.append((path, filename))
         
+        summary = await run_in_threadpool(rag_service.process_files, stored)
+        summary["skipped"] = skipped
+        return summary
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+@app.get('/upload/jobs/{job_id}')
+async def get_upload_job(job_id: str):
+    job = ingestion_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get('/upload/jobs')
+async def list_upload_jobs():
+    return ingestion_jobs.list_jobs()
+
+# Integration endpoints
+def _fetch_integration(platform: str, action: str, params: Optional[Dict[str, Any]] = None,
+                       refresh: bool = False, all_pages: bool = False) -> Dict[str, Any]:
+    """Run one blocking integration read, recording its latency and outcome"""
+    started = time.perf_counter()
+    status = "error"
+    try:
+        data = api_service.get_data(platform, action, params, use_cache=not refresh, all_pages=all_pages)
+        status = "ok" if data.get("success") else "error"
         return data
+    finally:
+        labels = _integration_labels(platform, action)
+        integration_seconds.observe(time.perf_counter() - started, **labels)
+        integration_requests_total.inc(status=status, **labels)
+
+@app.get('/integrations/{platform}/{action}')
+async def get_integration_data(platform: str, action: str, params: Optional[Dict[str, Any]] = None,
+                               refresh: bool = False, all_pages: bool = False):
+    """One page by default; all_pages=true walks a list action's pages up to INTEGRATION_MAX_PAGES"""
+    try:
+        return await run_in_threadpool(_fetch_integration, platform, action, params, refresh, all_pages)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post('/integrations/batch')
+async def get_integration_data_batch(request: IntegrationBatchRequest):
+    """Run many integration reads concurrently, each bounded by the request timeout
+
+    Results come back in request order once all items finish, or with
+    stream=true as NDJSON lines in completion order. A timed-out item is
+    reported as such; its upstream call finishes in the background.
+    """
+    if len(request.items) > INTEGRATION_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {INTEGRATION_BATCH_MAX} items per batch")
+    
+    async def run_item(index: int, item: IntegrationBatchItem) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = {"index": index, "id": item.id, "platform": item.platform, "action": item.action}
+        try:
+            data = await asyncio.wait_for(
+                asyncio.to_thread(_fetch_integration, item.platform, item.action, item.params, request.refresh,
+                                  item.all_pages),
+                timeout=request.timeout
+            )
+            if data.get("success"):
+                result.update(status="ok", data=data)
+            else:
+                result.update(status="error", error=data.get("error"))
+        except asyncio.TimeoutError:
+            result.update(status="timeout", error=f"No response within {request.timeout:g}s")
+        except Exception as e:
+            result.update(status="error", error=str(e))
+        result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    
+    tasks = [asyncio.ensure_future(run_item(index, item)) for index, item in enumerate(request.items)]
+    if request.stream:
+        async def ndjson():
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield json.dumps(await next_done) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    results = await asyncio.gather(*tasks)
+    return {
+        "results": results,
+        "succeeded": sum(1 for result in results if result["status"] == "ok"),
+        "failed": sum(1 for result in results if result["status"] != "ok")
+    }
+
+@app.get('/integrations/{platform}/{action}/stream')
+async def stream_integration_records(platform: str, action: str, request: Request):
+    """Stream the pages of a paginated list action as NDJSON, one line per page
+
+    Query parameters are passed through as API filters; page sets the first
+    page. At most INTEGRATION_MAX_PAGES are streamed. The last line is
+    {"type": "done", ...}, with truncated and next_page when that cap was hit,
+    or {"type": "error", ...}.
+    """
+    state = {}
+    try:
+        pages = api_service.iter_pages(platform, action, dict(request.query_params), state=state)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def ndjson():
+        started = time.perf_counter()
+        records = page_count = 0
+        status = "error"
+        try:
+            for page in pages:
+                records += len(page)
+                page_count += 1
+                yield json.dumps({"type": "records", "page": page_count, "data": page}) + "\n"
+            status = "ok"
+            yield json.dumps({"type": "done", "pages": page_count, "records": records,
+                              "truncated": state["truncated"], "next_page": state["next_page"],
+                              "seconds": round(time.perf_counter() - started, 3)}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "message": str(e), "pages": page_count, "records": records}) + "\n"
+        finally:
+            labels = _integration_labels(platform, action)
+            integration_seconds.observe(time.perf_counter() - started, **labels)
+            integration_requests_total.inc(status=status, **labels)
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get('/integrations/cache')
+async def get_integration_cache_stats():
+    try:
+        return api_service.cache.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete('/integrations/cache')
+async def clear_integration_cache(platform: Optional[str] = None):
+    try:
+        return {"deleted": api_service.cache.invalidate(platform)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -134,6 +494,92 @@ async def get_integration_status():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Local commerce data sync
+@app.post('/sync')
+async def sync_commerce_data(request: Optional[SyncRequest] = None):
+    """Pull records changed since the last run into the local store"""
+    try:
+        request = request or SyncRequest()
+        return await run_in_threadpool(commerce_sync.sync, request.entities, request.full)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/sync/status')
+async def get_sync_status():
+    try:
+        return commerce_sync.get_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/sync/{entity}')
+async def query_synced_records(entity: str, limit: int = 100, offset: int = 0, modified_since: Optional[str] = None):
+    """Read synced records from the local store, without network access"""
+    try:
+        return commerce_sync.query(entity, limit=limit, offset=offset, modified_since=modified_since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Analytics over the local commerce store
+@app.get('/analytics/summary')
+async def get_analytics_summary(days: int = 30):
+    try:
+        return await run_in_threadpool(commerce_analytics.summary, days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/analytics/revenue-by-day')
+async def get_revenue_by_day(days: int = 30):
+    try:
+        return await run_in_threadpool(commerce_analytics.revenue_by_day, days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/analytics/top-products')
+async def get_top_products(days: int = 30, limit: int = 10, by: str = 'revenue'):
+    try:
+        return await run_in_threadpool(commerce_analytics.top_products, days, limit, by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/analytics/refunds')
+async def get_refund_rates(days: int = 30):
+    try:
+        return await run_in_threadpool(commerce_analytics.refund_rates, days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/analytics/cohorts')
+async def get_cohort_retention(months: int = 6):
+    try:
+        return await run_in_threadpool(commerce_analytics.cohort_retention, months)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/analytics/context')
+async def get_analytics_context(days: int = 30, limit: int = 10):
+    """The compact tables /chat sends to the model when use_analytics is set"""
+    try:
+        tables = await run_in_threadpool(commerce_analytics.llm_context, days, limit)
+        return PlainTextResponse(tables)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # API Key management
 @app.post('/api-keys/save')
 async def save_api_key(request: APIKeyRequest):
@@ -149,8 +595,8 @@ async def save_api_key(request: APIKeyRequest):
 @app.post('/api-keys/validate')
 async def validate_api_key(request: APIKeyRequest):
     try:
-        is_valid = api_service.validate_api_key(request.platform, request.api_key)
-        return {"valid": is_valid, "platform": request.platform}
+        result = await key_validator.validate('integration', request.platform, request.api_key)
+        return {"valid": result["valid"], "platform": request.platform, "error": result["error"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -158,7 +604,11 @@ async def validate_api_key(request: APIKeyRequest):
 @app.post('/export')
 async def export_data(request: ExportRequest):
     try:
-        result = export_service.export_data(request.data, request.format, request.filename)
+        # Unknown formats share one label so user input cannot create unbounded series
+        format_label = request.format if request.format in ExportService.SUPPORTED_FORMATS else "unsupported"
+        with export_seconds.time(format=format_label):
+            result = export_service.export_data(request.data, request.format, request.filename)
+        exports_total.inc(format=format_label, status="ok" if result["success"] else "error")
         if result["success"]:
             return {
                 "message": "Data exported successfully",
@@ -190,9 +640,14 @@ async def delete_exported_file(filename: str):
 
 # RAG document management
 @app.get('/documents')
-async def list_documents():
+async def list_documents(limit: int = 50, cursor: Optional[str] = None, sort: str = 'ingested_at',
+                         order: str = 'desc', filename: Optional[str] = None,
+                         include_total: Optional[bool] = None):
     try:
-        return rag_service.list_documents()
+        return rag_service.list_documents(limit=limit, cursor=cursor, sort=sort, order=order, filename=filename,
+                                          include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -219,13 +674,20 @@ async def clear_all_documents():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post('/documents/query')
-async def query_documents(query: str, n_results: int = 5):
+async def query_documents(query: str, n_results: int = 5, mode: str = "hybrid"):
     try:
-        results = rag_service.query_documents(query, n_results)
+        results = await run_in_threadpool(rag_service.search_chunks, query, n_results, mode)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get('/rag/stats')
+async def get_rag_stats():
+    try:
+        return rag_service.get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # LLM model management
 @app.get('/models/available')
 async def get_available_models():
@@ -243,8 +705,15 @@ async def get_available_models():
 @app.post('/models/validate')
 async def validate_model(model: str, api_key: str):
     try:
-        is_valid = llm_service.validate_api_key(model, api_key)
-        return {"valid": is_valid, "model": model}
+        result = await key_validator.validate('llm', model, api_key)
+        return {"valid": result["valid"], "model": model, "error": result["error"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/llm/stats')
+async def get_llm_stats():
+    try:
+        return {**llm_service.get_stats(), "conversation_memory": conversation_memory.get_stats()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -260,16 +729,34 @@ class IntegrationValidationRequest(BaseModel):
 @app.post('/api/llm/validate-key')
 async def validate_llm_key(request: LLMValidationRequest):
     try:
-        is_valid = llm_service.validate_api_key(request.provider, request.apiKey)
-        return {"valid": is_valid, "provider": request.provider}
+        result = await key_validator.validate('llm', request.provider, request.apiKey)
+        return {"valid": result["valid"], "provider": request.provider, "error": result["error"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post('/api/integrations/validate-key')
 async def validate_integration_key(request: IntegrationValidationRequest):
     try:
-        is_valid = api_service.validate_api_key(request.integration, request.apiKey)
-        return {"valid": is_valid, "integration": request.integration}
+        result = await key_validator.validate('integration', request.integration, request.apiKey)
+        return {"valid": result["valid"], "integration": request.integration, "error": result["error"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class BulkValidationRequest(BaseModel):
+    llm: Optional[Dict[str, str]] = None
+    integrations: Optional[Dict[str, str]] = None
+    refresh: bool = False
+
+@app.post('/api/keys/validate-all')
+async def validate_all_keys(request: Optional[BulkValidationRequest] = None):
+    """Validate keys concurrently: the ones given, or every configured key when none are given"""
+    try:
+        request = request or BulkValidationRequest()
+        keys = None
+        if request.llm or request.integrations:
+            keys = [("llm", provider, key) for provider, key in (request.llm or {}).items()]
+            keys += [("integration", platform, key) for platform, key in (request.integrations or {}).items()]
+        return await key_validator.validate_all(keys, refresh=request.refresh)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -323,19 +810,93 @@ async def self_audit():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Service gauges, refreshed from each service's own statistics on every scrape
+llm_queue_depth = metrics.gauge("kr_llm_queue_depth", "Requests waiting for a provider concurrency slot", ("provider",))
+llm_in_flight = metrics.gauge("kr_llm_in_flight", "Requests in flight per provider", ("provider",))
+llm_concurrency_limit = metrics.gauge("kr_llm_concurrency_limit", "Adaptive concurrency limit per provider", ("provider",))
+llm_health_score = metrics.gauge("kr_llm_health_score", "Provider health score (0-1)", ("provider",))
+ingest_jobs = metrics.gauge("kr_ingest_jobs", "Retained ingestion jobs by status", ("status",))
+cache_hit_ratio = metrics.gauge("kr_cache_hit_ratio", "Cache hit ratio since startup", ("cache",))
+
+def _collect_service_gauges():
+    llm_stats = llm_service.get_stats()
+    for provider, limits in llm_stats["rate_limits"].items():
+        llm_queue_depth.set(limits["queue_depth"], provider=provider)
+        llm_in_flight.set(limits["in_flight"], provider=provider)
+        llm_concurrency_limit.set(limits["concurrency_limit"], provider=provider)
+    for provider, health in llm_stats["providers"].items():
+        llm_health_score.set(health["health_score"], provider=provider)
+    for status, count in ingestion_jobs.get_stats().items():
+        ingest_jobs.set(count, status=status)
+    rag_stats = rag_service.get_stats()
+    cache_hit_ratio.set(rag_stats["embedding_cache"]["hit_rate"], cache="embedding")
+    cache_hit_ratio.set(rag_stats["query_cache"]["hit_rate"], cache="rag_query")
+    if llm_stats["response_cache"]:
+        cache_hit_ratio.set(llm_stats["response_cache"]["hit_rate"], cache="llm_response")
+    cache_hit_ratio.set(api_service.cache.get_stats()["hit_rate"], cache="integrations")
+
+metrics.add_collector(_collect_service_gauges)
+
+@app.get('/metrics')
+async def get_metrics():
+    """Prometheus text exposition of latency histograms, counters and service gauges"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def _json_safe(seconds: Optional[float]) -> Any:
+    # The +Inf bucket means "slower than the largest bucket"
+    return ">60" if seconds == float("inf") else seconds
+
 # Health check
 @app.get('/health')
 async def health_check():
+    """Liveness plus a per-service check; status is "degraded" when a dependency is unusable"""
+    services = {}
+    
+    try:
+        services["rag"] = {"status": "ok", "chunks": rag_service.collection.count(),
+                           "documents": rag_service.catalog.count()}
+    except Exception as e:
+        services["rag"] = {"status": "error", "error": str(e)}
+    
+    configured = llm_service.configured_providers()
+    llm_stats = llm_service.get_stats()
+    services["llm"] = {
+        "status": "ok" if configured else "error",
+        "configured_providers": configured,
+        "providers": {
+            provider: {
+                "health_score": llm_stats["providers"][provider]["health_score"],
+                "p95_ms": llm_stats["providers"][provider]["p95_ms"],
+                "error_rate": llm_stats["providers"][provider]["error_rate"],
+                "queue_depth": llm_stats["rate_limits"].get(provider, {}).get("queue_depth", 0),
+                # Bucket upper bounds from the /chat stage histograms
+                "chat_p95_seconds": {
+                    stage: _json_safe(chat_stage_seconds.quantile(0.95, stage=stage, provider=provider))
+                    for stage in ("retrieval", "provider_call", "ttft")
+                }
+            }
+            for provider in configured
+        }
+    }
+    
+    jobs = ingestion_jobs.get_stats()
+    services["ingestion"] = {"status": "ok", "queued": jobs["queued"], "running": jobs["running"]}
+    
+    services["export"] = {"status": "ok" if os.access(export_service.storage_path, os.W_OK) else "error"}
+    
+    integrations = api_service.get_integration_status()
+    services["integrations"] = {
+        "status": "ok",
+        "connected": [name for name, integration in integrations.items() if integration["connected"]]
+    }
+    
     return {
-        "status": "healthy",
+        "status": "healthy" if all(service["status"] == "ok" for service in services.values()) else "degraded",
         "version": "0.1.0",
-        "services": {
-            "llm": "active",
-            "rag": "active",
-            "export": "active",
-            "integrations": "active"
-        }
+        "services": services
     }
 
 if __name__ == '__main__':
+    # Development only: extraction workers re-import this script and rebuild every service.
+    # Run the server with `uvicorn main:app --host 0.0.0.0 --port 8000` instead.
     uvicorn.run(app, host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,62 @@
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    # The module builds a global service whose cache lives at ../storage relative to the cwd
+    (tmp_path / "backend").mkdir()
+    monkeypatch.chdir(tmp_path / "backend")
+    api_service = importlib.import_module("integrations.api_service")
+
+    service = api_service.APIIntegrationService.__new__(api_service.APIIntegrationService)
+    service.max_pages = 5
+    service.fetch_concurrency = 2
+    service._fetch_pool = ThreadPoolExecutor(max_workers=2)
+    yield service
+    service._fetch_pool.shutdown()
+
+
+def paged(pages, per_page=2, report_total=True):
+    """fetch_page over numbered records, pages items per page"""
+    requested = []
+
+    def fetch_page(page):
+        requested.append(page)
+        first = (page - 1) * per_page
+        records = list(range(first, min(first + per_page, pages * per_page - 1)))
+        return records, pages if report_total else None
+
+    return fetch_page, requested
+
+
+@pytest.mark.parametrize("report_total", [True, False])
+def test_iter_pages_yields_every_page_in_order(service, report_total):
+    fetch_page, requested = paged(4, report_total=report_total)
+    state = {}
+    records = [record for page in service._iter_pages(fetch_page, 2, state) for record in page]
+
+    assert records == list(range(7))
+    # Without a total, pages are fetched a window ahead, so one past the end may be requested
+    assert sorted(requested)[:4] == [1, 2, 3, 4]
+    assert len(requested) <= 4 + service.fetch_concurrency - 1
+    assert state == {"pages": 4, "truncated": False, "next_page": None}
+
+
+@pytest.mark.parametrize("report_total", [True, False])
+def test_iter_pages_stops_at_max_pages_and_reports_the_next_page(service, report_total):
+    fetch_page, requested = paged(20, report_total=report_total)
+    state = {}
+    pages = list(service._iter_pages(fetch_page, 2, state, start=3))
+
+    assert pages[0] == [4, 5] and pages[-1] == [12, 13]
+    assert max(requested) == 7
+    assert state == {"pages": 5, "truncated": True, "next_page": 8}
+
+
+def test_iter_pages_skips_empty_first_page(service):
+    state = {}
+    assert list(service._iter_pages(lambda page: ([], None), 2, state)) == []
+    assert state["pages"] == 1 and not state["truncated"]
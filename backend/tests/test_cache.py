@@ -0,0 +1,36 @@
+import time
+
+from core.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUCache(ttl=0.05)
+    cache.set("query", ["chunk"])
+    cache.set("pinned", ["chunk"], ttl=60)
+    time.sleep(0.1)
+
+    assert cache.get("query", "expired") == "expired"
+    assert cache.get("pinned") == ["chunk"]
+    assert len(cache) == 1
+
+
+def test_clear_invalidates_everything_and_stats_count_lookups():
+    cache = LRUCache()
+    cache.set(("query", 5, 0), "results")
+    assert cache.get(("query", 5, 0)) == "results"
+    cache.clear()
+    assert cache.get(("query", 5, 0)) is None
+
+    stats = cache.get_stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (0, 1, 1, 0.5)
@@ -0,0 +1,37 @@
+from core.chunking import TextChunker, content_hash
+
+
+def test_content_hash_ignores_whitespace_and_unicode_form():
+    assert content_hash("Order  WC-1042\nshipped") == content_hash("Order WC-1042 shipped ")
+    # Precomposed "e acute" vs. "e" followed by a combining acute accent
+    assert content_hash("caf\u00e9") == content_hash("cafe\u0301")
+
+
+def test_content_hash_changes_with_content():
+    assert content_hash("order shipped") != content_hash("order refunded")
+    assert len(content_hash("anything")) == 32
+
+
+def test_split_text_overlaps_and_reports_offsets():
+    text = " ".join(f"w{i}" for i in range(50))
+    chunks = TextChunker(chunk_size=20, chunk_overlap=5).split_text(text)
+
+    assert [chunk["token_count"] for chunk in chunks] == [20, 20, 20]
+    for chunk in chunks:
+        assert text[chunk["offset"]:].startswith(chunk["text"])
+    # Each chunk starts chunk_overlap tokens before the previous one ended
+    assert chunks[1]["text"].split()[:5] == chunks[0]["text"].split()[-5:]
+
+
+def test_split_segments_keeps_atomic_segments_whole():
+    chunker = TextChunker(chunk_size=5, chunk_overlap=1)
+    segments = [
+        {"text": "header\nrow one\nrow two", "sheet": "Orders", "row_start": 2, "row_end": 3, "atomic": True},
+        {"text": " ".join(f"w{i}" for i in range(8)), "page": 4}
+    ]
+    chunks = list(chunker.split_segments(segments))
+
+    assert chunks[0]["text"] == "header\nrow one\nrow two"
+    assert chunks[0]["sheet"] == "Orders" and "offset" not in chunks[0] and "atomic" not in chunks[0]
+    assert all(chunk["page"] == 4 and "offset" in chunk for chunk in chunks[1:])
+    assert len(chunks) == 3
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from integrations.commerce_analytics import CommerceAnalytics
+from integrations.sync_service import CommerceSyncService
+
+
+def days_ago(days: int) -> str:
+    return (datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+            - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def order(order_id, status, total, created, customer_id=7, email="ann@example.com", items=(), refunds=()):
+    return {
+        "id": order_id, "status": status, "total": str(total), "customer_id": customer_id,
+        "billing": {"email": email}, "date_created_gmt": created, "date_modified_gmt": created,
+        "line_items": [dict(item, id=index) for index, item in enumerate(items, 1)],
+        "refunds": [{"total": str(-amount)} for amount in refunds]
+    }
+
+
+@pytest.fixture
+def analytics(tmp_path):
+    db_path = str(tmp_path / "commerce.sqlite3")
+    sync = CommerceSyncService(None, db_path)
+    sync._upsert("orders", [
+        order(1, "completed", 100, days_ago(0), items=[
+            {"product_id": 1, "sku": "A", "name": "Mug", "quantity": 2, "total": "80"},
+            {"product_id": 2, "sku": "", "name": "Gift", "quantity": 1, "total": "20"}
+        ]),
+        order(2, "refunded", 50, days_ago(1), customer_id=0, email="Guest@Example.com", refunds=[50], items=[
+            {"product_id": 1, "sku": "A", "name": "Mug", "quantity": 1, "total": "50"}
+        ]),
+        order(3, "pending", 999, days_ago(0)),
+        order(4, "completed", 30, days_ago(40))
+    ])
+    sync._upsert("transactions", [
+        {"id": "t1", "type": "sale", "amount": "100", "created_at": days_ago(0)},
+        {"id": "t2", "type": "capture", "amount": "50", "created_at": days_ago(1)},
+        {"id": "t3", "type": "refund", "amount": "-30", "created_at": days_ago(1)},
+        {"id": "t4", "type": "refund", "amount": "-500", "created_at": days_ago(40)}
+    ])
+    return CommerceAnalytics(db_path)
+
+
+def test_summary_counts_sale_orders_in_the_period(analytics):
+    assert analytics.summary(30) == {
+        "days": 30, "orders": 2, "customers": 2, "gross_revenue": 150.0, "refunds": 50.0,
+        "net_revenue": 100.0, "aov": 75.0, "refund_rate": 0.3333
+    }
+    assert analytics.summary(60)["orders"] == 3
+
+
+def test_revenue_by_day_fills_days_without_orders(analytics):
+    days = analytics.revenue_by_day(7)
+
+    assert len(days) == 7
+    assert days[-1]["date"] == datetime.utcnow().strftime("%Y-%m-%d")
+    assert (days[-1]["orders"], days[-1]["gross_revenue"], days[-1]["aov"]) == (1, 100.0, 100.0)
+    assert (days[-2]["gross_revenue"], days[-2]["refunds"], days[-2]["net_revenue"]) == (50.0, 50.0, 0.0)
+    assert all(day["orders"] == 0 and day["aov"] == 0.0 for day in days[:-2])
+
+
+def test_top_products_groups_by_sku_with_name_fallback(analytics):
+    products = analytics.top_products(30)
+
+    assert [product["sku"] for product in products] == ["A", "(no sku) Gift"]
+    assert products[0] == {"sku": "A", "name": "Mug", "quantity": 3.0, "revenue": 130.0, "orders": 2,
+                           "share": 0.8667}
+    assert [product["sku"] for product in analytics.top_products(30, limit=1, by="orders")] == ["A"]
+    with pytest.raises(ValueError):
+        analytics.top_products(30, by="margin")
+
+
+def test_refund_rates_from_orders_and_transactions(analytics):
+    rates = analytics.refund_rates(30)
+
+    assert rates["orders"]["value_rate"] == 0.3333
+    assert rates["orders"]["order_rate"] == 0.5
+    assert sum(week["orders"] for week in rates["orders"]["weekly"]) == 2
+    assert rates["transactions"] == {"sales": 150.0, "refunds": 30.0, "value_rate": 0.2}
+
+
+def test_days_must_be_positive(analytics):
+    with pytest.raises(ValueError):
+        analytics.summary(0)
@@ -0,0 +1,53 @@
+from core.context_packer import CONTEXT_WINDOWS, ContextPacker
+
+
+def test_count_tokens_uses_provider_ratio():
+    packer = ContextPacker()
+    assert packer.count_tokens("", "openai") == 0
+    assert packer.count_tokens("a" * 40, "openai") == 10
+    assert packer.count_tokens("a" * 35, "claude") == 10
+    assert packer.count_tokens("a" * 41, "unknown") == 11
+
+
+def test_budget_is_capped_by_the_context_window():
+    packer = ContextPacker(default_budget=1500, reserved_output_tokens=1000)
+    assert packer.budget_for("openai", "question") == 1500
+    assert packer.budget_for("qwen", "", budget=50000) == CONTEXT_WINDOWS["qwen"] - 1000
+    assert packer.budget_for("qwen", "a" * 33000, budget=50000) == 0
+
+
+def test_pack_orders_by_score_and_drops_near_duplicates():
+    packer = ContextPacker()
+    text = "order WC-1042 was shipped to Lisbon on Monday by express courier"
+    result = packer.pack([
+        {"text": "refund issued for order WC-7", "score": 0.2},
+        {"text": text, "score": 0.9},
+        {"text": text + ".", "score": 0.5},
+        {"text": "   ", "score": 1.0}
+    ])
+
+    assert result["context"] == text + "\n\nrefund issued for order WC-7"
+    assert result["passages_used"] == 2
+    assert result["passages_dropped_duplicate"] == 1
+    assert not result["truncated"]
+
+
+def test_pack_truncates_the_last_passage_to_the_budget():
+    packer = ContextPacker()
+    passages = [{"text": " ".join(f"word{i}" for i in range(100)), "score": 1.0},
+                {"text": "never reached", "score": 0.1}]
+    result = packer.pack(passages, budget=50)
+
+    assert result["truncated"]
+    assert result["passages_used"] == 1
+    assert 0 < result["tokens_used"] <= 50
+    assert packer.count_tokens(result["context"]) == result["tokens_used"]
+    assert passages[0]["text"].startswith(result["context"])
+
+
+def test_truncate_cuts_on_a_word_boundary():
+    packer = ContextPacker()
+    clipped = packer.truncate("alpha beta gamma delta", 3)
+    assert clipped == "alpha beta"
+    assert packer.count_tokens(clipped) <= 3
+    assert packer.truncate("short", 10) == "short"
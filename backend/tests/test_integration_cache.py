@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from core.integration_cache import IntegrationCache
+
+
+def make_cache(tmp_path, ttl=60, **kwargs):
+    return IntegrationCache(str(tmp_path / "integrations.sqlite3"), ttls={("shop", "orders"): ttl}, **kwargs)
+
+
+class Upstream:
+    """fetch callable that records the conditional headers it was called with"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, headers):
+        self.calls.append(headers)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_miss_then_hit(tmp_path):
+    cache = make_cache(tmp_path)
+    upstream = Upstream((200, {"orders": [1]}, None, None))
+
+    first = cache.get_or_fetch("shop", "orders", {"page": 1}, upstream)
+    second = cache.get_or_fetch("shop", "orders", {"page": 1}, upstream)
+
+    assert first["cache"]["status"] == "miss" and second["cache"]["status"] == "hit"
+    assert second["orders"] == [1]
+    assert len(upstream.calls) == 1
+    assert cache.get_or_fetch("shop", "orders", {"page": 1}, upstream, use_cache=False)["cache"]["status"] == "miss"
+
+
+def test_stale_entry_is_served_while_refreshing_in_background(tmp_path):
+    cache = make_cache(tmp_path, ttl=0, swr_seconds=60)
+    upstream = Upstream((200, {"orders": [1]}, None, None), (200, {"orders": [2]}, None, None))
+
+    cache.get_or_fetch("shop", "orders", None, upstream)
+    stale = cache.get_or_fetch("shop", "orders", None, upstream)
+    cache._refresh_pool.shutdown(wait=True)
+
+    assert stale["cache"]["status"] == "stale" and stale["orders"] == [1]
+    assert len(upstream.calls) == 2
+    assert cache._load(cache.make_key("shop", "orders"))["payload"] == {"orders": [2]}
+
+
+def test_expired_entry_is_revalidated_with_its_etag(tmp_path):
+    cache = make_cache(tmp_path, ttl=0, swr_seconds=0)
+    upstream = Upstream((200, {"orders": [1]}, '"v1"', "Mon, 05 Oct 2026 10:00:00 GMT"), (304, None, None, None))
+
+    cache.get_or_fetch("shop", "orders", None, upstream)
+    result = cache.get_or_fetch("shop", "orders", None, upstream)
+
+    assert result["cache"]["status"] == "revalidated" and result["orders"] == [1]
+    assert upstream.calls[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 05 Oct 2026 10:00:00 GMT"}
+    assert cache.get_stats()["revalidated_not_modified"] == 1
+
+
+def test_upstream_failure_serves_the_cached_copy(tmp_path):
+    cache = make_cache(tmp_path, ttl=0, swr_seconds=0)
+    upstream = Upstream((200, {"orders": [1]}, None, None), RuntimeError("gateway down"))
+
+    cache.get_or_fetch("shop", "orders", None, upstream)
+    result = cache.get_or_fetch("shop", "orders", None, upstream)
+
+    assert result["cache"]["status"] == "stale" and result["orders"] == [1]
+    assert "gateway down" in cache.get_stats()["last_error"]
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("shop", "orders", {"page": 2}, upstream)
+
+
+def test_slow_upstream_falls_back_after_fetch_timeout(tmp_path):
+    cache = make_cache(tmp_path, ttl=0, swr_seconds=0, fetch_timeout=0.05)
+    release = threading.Event()
+    upstream = Upstream((200, {"orders": [1]}, None, None))
+
+    cache.get_or_fetch("shop", "orders", None, upstream)
+
+    def slow(headers):
+        release.wait(5)
+        return 200, {"orders": [2]}, None, None
+
+    started = time.monotonic()
+    result = cache.get_or_fetch("shop", "orders", None, slow)
+    assert time.monotonic() - started < 1
+    assert result["cache"]["status"] == "stale" and result["orders"] == [1]
+    assert cache.get_stats()["slow_upstream"] == 1
+
+    # The slow fetch still lands in the cache once it completes
+    release.set()
+    cache._refresh_pool.shutdown(wait=True)
+    assert cache._load(cache.make_key("shop", "orders"))["payload"] == {"orders": [2]}
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes(tmp_path):
+    payload = {"orders": ["x" * 80]}
+    cache = make_cache(tmp_path, max_bytes=250)
+    upstream = Upstream((200, payload, None, None))
+
+    cache.get_or_fetch("shop", "orders", {"page": 1}, upstream)
+    cache.get_or_fetch("shop", "orders", {"page": 2}, upstream)
+    time.sleep(0.01)
+    cache.get_or_fetch("shop", "orders", {"page": 1}, upstream)
+    cache.get_or_fetch("shop", "orders", {"page": 3}, upstream)
+
+    stats = cache.get_stats()
+    assert stats["evicted"] == 1 and stats["entries"] == 2 and stats["bytes"] <= 250
+    assert cache._load(cache.make_key("shop", "orders", {"page": 2})) is None
+    assert cache._load(cache.make_key("shop", "orders", {"page": 1})) is not None
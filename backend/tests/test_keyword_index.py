@@ -0,0 +1,57 @@
+from core.keyword_index import KeywordIndex, reciprocal_rank_fusion, tokenize
+
+
+def _index(tmp_path):
+    return KeywordIndex(str(tmp_path / "keyword_index.sqlite3"))
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("Refund for WC-1042") == ["refund", "for", "wc-1042", "wc", "1042"]
+
+
+def test_search_ranks_exact_identifier_matches_first(tmp_path):
+    index = _index(tmp_path)
+    index.add([
+        ("c1", "d1", "Order WC-1042 was refunded in full"),
+        ("c2", "d1", "Order WC-2001 shipped with tracking"),
+        ("c3", "d2", "Shipping policy for all orders and returns")
+    ])
+
+    results = index.search("WC-1042 refund", n_results=3)
+    assert results[0][0] == "c1"
+    assert all(score > 0 for _, score in results)
+    assert "c3" not in [chunk_id for chunk_id, _ in results]
+
+
+def test_reindexing_and_delete_keep_statistics_consistent(tmp_path):
+    index = _index(tmp_path)
+    index.add([("c1", "d1", "alpha beta"), ("c2", "d1", "gamma")])
+    index.add([("c1", "d1", "alpha beta delta")])  # re-adding replaces the old postings
+    assert index.count() == 2
+    assert index.get_stats()["avg_chunk_length"] == 2.0
+
+    index.delete(["c1"])
+    assert index.count() == 1
+    assert index.search("alpha") == []
+
+    # Counters survive a reopen
+    assert _index(tmp_path).count() == 1
+
+
+def test_reciprocal_rank_fusion_rewards_agreement_and_fills_texts():
+    vector = [{"id": "a", "text": "A", "metadata": {"page": 1}},
+              {"id": "b", "text": "B", "metadata": {}}]
+    keyword = [{"id": "b", "text": None, "metadata": None},
+               {"id": "c", "text": None, "metadata": None}]
+
+    fused = reciprocal_rank_fusion([vector, keyword], n_results=2)
+
+    assert [chunk["id"] for chunk in fused] == ["b", "a"]
+    assert fused[0]["score"] == 1 / 62 + 1 / 61
+    assert fused[0]["text"] == "B"
+
+
+def test_reciprocal_rank_fusion_takes_texts_from_a_later_ranking():
+    fused = reciprocal_rank_fusion([[{"id": "x", "text": None, "metadata": None}],
+                                    [{"id": "x", "text": "X", "metadata": {"sheet": "S"}}]], n_results=5)
+    assert fused[0]["text"] == "X" and fused[0]["metadata"] == {"sheet": "S"}
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import pytest
+
+from core.rate_limiter import ProviderGovernor, QueueFullError, TokenBucket
+
+
+def test_token_bucket_reserve_and_refund():
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+    assert bucket.reserve(2) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    bucket.refund(1)
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_full_queue_rejects_without_spending_rate_budget():
+    governor = ProviderGovernor("test", max_concurrency=1, max_queue=0)
+
+    async def main():
+        async with governor.slot(estimated_tokens=100):
+            requests, tokens = governor.requests._tokens, governor.tokens._tokens
+            with pytest.raises(QueueFullError):
+                async with governor.slot(estimated_tokens=100):
+                    pass
+            assert governor.requests._tokens == pytest.approx(requests, abs=0.1)
+            assert governor.tokens._tokens == pytest.approx(tokens, abs=1)
+
+    asyncio.run(main())
+    assert governor.get_stats()["rejected"] == 1
+    assert governor.in_flight == 0
+
+
+def test_waiters_are_served_in_fifo_order():
+    governor = ProviderGovernor("test", max_concurrency=1)
+    order = []
+
+    async def worker(name):
+        async with governor.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(worker(name) for name in "abc"))
+
+    asyncio.run(main())
+    assert order == ["a", "b", "c"]
+    assert governor.get_stats()["max_queue_depth"] == 2
+
+
+@pytest.mark.parametrize("resolved_first", [False, True])
+def test_cancelled_waiter_does_not_leak_a_granted_slot(resolved_first):
+    governor = ProviderGovernor("test", max_concurrency=1)
+
+    async def waiter():
+        async with governor.slot():
+            pytest.fail("cancelled waiter must not enter the slot")
+
+    async def main():
+        async with governor.slot():
+            task = asyncio.ensure_future(waiter())
+            await asyncio.sleep(0)
+            assert governor.get_stats()["queue_depth"] == 1
+        # Leaving the slot granted it to the waiter; cancel before the waiter resumes
+        if resolved_first:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert governor.in_flight == 0
+    assert governor.get_stats()["queue_depth"] == 0
+
+
+def test_throttling_halves_the_limit_and_honors_retry_after():
+    governor = ProviderGovernor("test", max_concurrency=8, min_concurrency=1)
+    governor.record(429, retry_after="2")
+    assert governor.limit == 4
+    assert 1.5 < governor.blocked_until - time.monotonic() <= 2
+    for _ in range(4):
+        governor.record(503)
+    assert governor.limit == 1
+    governor.record(200)
+    assert governor.limit == 2
+    assert governor.get_stats()["throttled_responses"] == 5
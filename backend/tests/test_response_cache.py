@@ -0,0 +1,74 @@
+import time
+
+from core.response_cache import ResponseCache
+
+VECTORS = {
+    "What was revenue last week?": [1.0, 0.0, 0.0],
+    "what was last week's revenue": [0.99, 0.14, 0.0],
+    "List refunded orders": [0.0, 1.0, 0.0],
+}
+
+
+def _embed(texts):
+    return [VECTORS[text] for text in texts]
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), **kwargs)
+
+
+def test_exact_hits_are_keyed_by_prompt_and_context(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("openai", "gpt-4", "hello", "Hi!", context="ctx-a")
+
+    assert cache.get("openai", "gpt-4", "hello", context="ctx-a")["match"] == "exact"
+    assert cache.get("openai", "gpt-4", "hello", context="ctx-b") is None
+    assert cache.get("openai", "gpt-4o", "hello", context="ctx-a") is None
+    assert cache.get_stats()["exact_hits"] == 1 and cache.get_stats()["misses"] == 2
+
+
+def test_entries_expire(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("openai", "gpt-4", "hello", "Hi!", ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("openai", "gpt-4", "hello") is None
+
+
+def test_evicts_least_recently_used_beyond_max_entries(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.set("openai", "gpt-4", "a", "A")
+    cache.set("openai", "gpt-4", "b", "B")
+    assert cache.get("openai", "gpt-4", "a")  # "b" becomes the least recently used
+    cache.set("openai", "gpt-4", "c", "C")
+
+    assert cache.get("openai", "gpt-4", "b") is None
+    assert cache.get("openai", "gpt-4", "a") and cache.get("openai", "gpt-4", "c")
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_semantic_hits_require_the_same_context(tmp_path):
+    cache = _cache(tmp_path, embedding_function=_embed, similarity_threshold=0.95)
+    cache.set("openai", "gpt-4", "What was revenue last week?", "$12,400", context="store metrics")
+
+    hit = cache.get("openai", "gpt-4", "what was last week's revenue", context="store metrics")
+    assert hit["match"] == "semantic" and hit["response"] == "$12,400"
+    assert 0.95 <= hit["similarity"] < 1.0
+
+    assert cache.get("openai", "gpt-4", "what was last week's revenue", context="other metrics") is None
+    assert cache.get("openai", "gpt-4", "List refunded orders", context="store metrics") is None
+
+
+def test_semantic_tier_forgets_evicted_entries(tmp_path):
+    cache = _cache(tmp_path, embedding_function=_embed, max_entries=1)
+    cache.set("openai", "gpt-4", "What was revenue last week?", "$12,400")
+    # Loads the embedding matrix, so the eviction below must also update it in memory
+    assert cache.get("openai", "gpt-4", "what was last week's revenue")
+    cache.set("openai", "gpt-4", "List refunded orders", "#1042")
+
+    assert cache.get("openai", "gpt-4", "what was last week's revenue") is None
+
+
+def test_semantic_matches_survive_a_reopen(tmp_path):
+    _cache(tmp_path, embedding_function=_embed).set("openai", "gpt-4", "What was revenue last week?", "$12,400")
+    reopened = _cache(tmp_path, embedding_function=_embed)
+    assert reopened.get("openai", "gpt-4", "what was last week's revenue")["response"] == "$12,400"
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from core.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.get_stats() == {"in_flight": 0, "upstream_calls": 1, "collapsed_calls": 4}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+
+    async def main():
+        first = await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")),
+                                     flight.do("b", lambda: asyncio.sleep(0, "b")))
+        again = await flight.do("a", lambda: asyncio.sleep(0, "a2"))
+        return first, again
+
+    assert asyncio.run(main()) == (["a", "b"], "a2")
+    assert flight.get_stats()["upstream_calls"] == 3
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        follower = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(main()) == ("answer", True)
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        return await flight.do("key", lambda: asyncio.sleep(0, "recovered"))
+
+    assert asyncio.run(main()) == "recovered"